@@ -18,7 +18,7 @@ if project_root not in sys.path:
 # Third-party imports
 from flask import (
     Flask, render_template, request, jsonify, session, g, flash, 
-    redirect, url_for, current_app, abort, send_from_directory
+    redirect, url_for, current_app, abort, send_from_directory, Response
 )
 from flask_login import (
     LoginManager, UserMixin, login_user, login_required, 
@@ -34,7 +34,6 @@ from dotenv import load_dotenv
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 import socketio
 from bson.objectid import ObjectId
-from flask_mail import Mail, Message
 
 # Now import the accounts repository service
 from services.accounts_reposervice import account_repo_service
@@ -50,6 +49,15 @@ app = Flask(__name__)
 # Load environment variables
 load_dotenv()
 
+# Number of reverse proxies in front of the app whose X-Forwarded-* headers
+# are trusted. Rate limits key on request.remote_addr, so behind a proxy this
+# must be set or every client shares the proxy's address and budget.
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+if TRUSTED_PROXY_COUNT:
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT, x_proto=TRUSTED_PROXY_COUNT,
+                            x_host=TRUSTED_PROXY_COUNT)
+
 # Configure app
 app.config.update(
     # Flask settings
@@ -88,15 +96,21 @@ logger = logging.getLogger(__name__)
 
 # Initialize extensions
 db = SQLAlchemy()
-mail = Mail()
 csrf = CSRFProtect()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager = LoginManager(app)
 login_manager.login_view = 'auth.login'  # Update this to your login route
 
-# Initialize Socket.IO
-sio = socketio.Server(cors_allowed_origins="*")
+# Initialize Socket.IO. connect() restores the chatbot conversation from the
+# session cookie, so only the app's own origin may open a socket: any other
+# page could otherwise connect with a visitor's cookie and read their chat.
+# None lets python-socketio accept only same-origin connections.
+SOCKETIO_ALLOWED_ORIGINS = [
+    origin.strip().rstrip('/') for origin in os.getenv('SOCKETIO_ALLOWED_ORIGINS', os.getenv('APP_URL', '')).split(',')
+    if origin.strip()
+] or None
+sio = socketio.Server(cors_allowed_origins=SOCKETIO_ALLOWED_ORIGINS)
 app.wsgi_app = socketio.WSGIApp(sio, app.wsgi_app)
 
 # Import database service
@@ -106,6 +120,10 @@ except ImportError as e:
     logging.error(f"Failed to import database service: {e}")
     raise
 
+# Column metadata is loaded once, off the request path
+from services.schema_service import schema_service
+schema_service.preload()
+
 # Import forms after app creation to avoid circular imports
 from app.forms import (
     ForgotPasswordForm, 
@@ -123,12 +141,14 @@ app.config['SERVER_NAME'] = 'localhost:5000'  # Update with your domain in produ
 app.config['APPLICATION_ROOT'] = '/'
 app.config['PREFERRED_URL_SCHEME'] = 'http'
 
-# Initialize rate limiter
+# Initialize rate limiter; counters live in shared storage so limits hold across workers
+from utils.rate_limit import RATE_LIMIT_STORAGE_URI
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy="sliding-window-counter"
 )
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key')
 
@@ -140,8 +160,9 @@ app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', os.getenv('MAIL_USERNAME'))
 
-# Initialize Flask-Mail
-mail = Mail(app)
+# Outbound mail is queued and delivered by background workers
+from services.mail_service import mail_service
+mail_service.start()
 
 class SensitiveDataFilter(logging.Filter):
     def filter(self, record):
@@ -171,10 +192,6 @@ csrf = CSRFProtect(app)
 def inject_csrf_token():
     return dict(csrf_token=generate_csrf)
 
-# Initialize Socket.IO
-sio = socketio.Server(cors_allowed_origins="*")
-app.wsgi_app = socketio.WSGIApp(sio, app.wsgi_app)
-
 # Add headers to prevent caching of authenticated pages
 @app.after_request
 def add_header(response):
@@ -406,17 +423,13 @@ from models import User
 
 @login_manager.user_loader
 def load_user(user_id):
-    print(f"\n[DEBUG] ====== load_user called ======")
-    print(f"[DEBUG] Provided User Id:{user_id} ")
-    print(f"[DEBUG] Current session: {dict(session)}")
-    
     try:    
         if not user_id:
             print("[DEBUG] Empty user_id provided")
             return None
         
-        result = account_repo_service.get_account_by_user_id(user_id)
-        result_data = result.data[0] if result and result.data else None
+        # Served from the identity cache; only misses hit user_accounts
+        result_data = account_repo_service.get_cached_account(user_id)
         if result_data and len(result_data) > 0:
           user_obj = User.to_user_dto_obj(result_data)
           return user_obj
@@ -433,22 +446,38 @@ def load_user(user_id):
 # Chatbot route (accessible to all)
 @app.route('/chatbot')
 def chatbot():
+    # Set the conversation id now so the Socket.IO handshake carries it in the cookie
+    if 'chatbot_conversation' not in session:
+        session['chatbot_conversation'] = secrets.token_hex(16)
     return render_template('chatbot.html')
 
 # Chatbot message handler (no API, rule-based)
 from flask import jsonify
-from chatbot_rules import get_bot_response
+from services.chatbot_engine import chatbot_engine
+from services.chatbot_session_service import chatbot_session_service
+
+def _chatbot_session_key():
+    """Key for the caller's server-side chatbot state, plus the user id if logged in."""
+    if 'chatbot_conversation' not in session:
+        session['chatbot_conversation'] = secrets.token_hex(16)
+    user_id = current_user.id if current_user.is_authenticated else None
+    return chatbot_session_service.session_key(session['chatbot_conversation'], user_id), user_id
 
 @app.route('/chatbot/message', methods=['POST'])
 @csrf.exempt
 @limiter.limit("10 per minute")
 def chatbot_message():
-    data = request.get_json()
-    user_message = data.get('message', '')
-    last_topic = data.get('last_topic')
-    user_facts = data.get('user_facts', {})
-    bot_reply, new_topic, updated_facts = get_bot_response(user_message, last_topic, user_facts)
-    return jsonify({'reply': bot_reply, 'topic': new_topic, 'user_facts': updated_facts})
+    data = request.get_json(silent=True) or {}
+    # Topic and facts are kept server-side, so the request only carries the message
+    key, user_id = _chatbot_session_key()
+    return jsonify(chatbot_engine.respond(key, data.get('message', ''), user_id))
+
+@app.route('/chatbot/reset', methods=['POST'])
+@csrf.exempt
+def chatbot_reset():
+    key, user_id = _chatbot_session_key()
+    chatbot_session_service.clear(key, user_id)
+    return jsonify({'success': True})
 
 
 # Static page routes
@@ -500,21 +529,16 @@ def verify_reset_token(token, max_age=3600):
         return None
 
 def send_reset_email(user_email, reset_url):
-    """Send password reset email"""
+    """Queue the password reset email; the mail workers deliver it in the background"""
     try:
-        msg = Message(
+        mail_service.send_template(
+            'reset_password_email.html',
             'Password Reset Request - UNICARE',
-            recipients=[user_email]
-        )
-        
-        msg.html = render_template(
-            'email/reset_password_email.html',
+            [user_email],
             reset_url=reset_url,
             current_year=datetime.utcnow().year
         )
-        
-        mail.send(msg)
-        logger.info(f'Password reset email sent to {user_email}')
+        logger.info(f'Password reset email queued for {user_email}')
         return True
     except Exception as e:
         logger.error(f'Error sending password reset email: {str(e)}')
@@ -548,10 +572,6 @@ def forgot_password():
                 # Send password reset email
                 reset_url = url_for('reset_password', token=reset_token, _external=True)
                 
-                # Render email content
-                html_content = render_template('email/reset_password_email.html', 
-                                            user=user, 
-                                            reset_url=reset_url)
                 text_content = f"""
                 Hello {user.first_name or 'there'},
 
@@ -566,12 +586,15 @@ def forgot_password():
                 The UNICARE Team
                 """
                 
-                # Send the email
-                send_email(
-                    subject="Reset Your UNICARE Password",
-                    recipients=[user.email],
-                    text_body=text_content,
-                    html_body=html_content
+                # Queue the email; delivery doesn't hold up the request
+                mail_service.send_template(
+                    'reset_password_email.html',
+                    "Reset Your UNICARE Password",
+                    [user.email],
+                    text=text_content,
+                    user=user,
+                    reset_url=reset_url,
+                    current_year=datetime.utcnow().year
                 )
             
             # Always show success message to prevent email enumeration
@@ -782,55 +805,32 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import pytz
 # Forms are already imported at the top of the file
 from services.database_service import db_service
-
-def login_limiter(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # Skip rate limiting in development
-        if app.config.get('ENV') == 'development':
-            return f(*args, **kwargs)
-            
-        current_time = datetime.now(pytz.utc)
-        
-        # Initialize session variables if they don't exist
-        if 'login_attempts' not in session:
-            session['login_attempts'] = 0
-            session['first_attempt'] = current_time.timestamp()
-        
-        # Reset attempts if more than 5 minutes have passed since first attempt
-        time_since_first_attempt = current_time.timestamp() - session['first_attempt']
-        if time_since_first_attempt > 300:  # 5 minutes in seconds
-            session['login_attempts'] = 0
-            session['first_attempt'] = current_time.timestamp()
-        
-        # Check if too many attempts (increased to 10 for development)
-        max_attempts = 10  # Increased from 5 to 10
-        if session.get('login_attempts', 0) >= max_attempts:
-            time_left = int(300 - time_since_first_attempt)  # Time left in seconds
-            minutes, seconds = divmod(time_left, 60)
-            flash(f'Too many login attempts. Please try again in {minutes}m {seconds}s.', 'danger')
-            return redirect(url_for('login_selector')), 429  # 429: Too Many Requests
-        
-        # Increment login attempts
-        session['login_attempts'] = session.get('login_attempts', 0) + 1
-        session.modified = True
-        
-        # Log the attempt
-        print(f"[LOGIN] Login attempt {session['login_attempts']}/{max_attempts} from {request.remote_addr}")
-        
-        return f(*args, **kwargs)
-    return decorated_function
+from utils.login_limiter import login_limiter
+from utils.rate_limit import login_rate_limiter
+from utils.metrics import latency_metrics
 
 @app.route('/clear-rate-limit', methods=['GET'])
 def clear_rate_limit():
-    """Clear rate limiting for the current session (development only)."""
-    if 'login_attempts' in session:
-        session.pop('login_attempts')
-    if 'first_attempt' in session:
-        session.pop('first_attempt')
+    """Clear login rate limiting for this client (development only)."""
+    if not (app.debug or app.config.get('ENV') == 'development'):
+        abort(404)
+    login_rate_limiter.reset(request.remote_addr, request.args.get('email'))
     flash('Rate limit has been reset.', 'success')
     return redirect(url_for('login_selector'))
 
+# Bearer token for scrapers; without it /metrics is admin-only
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics():
+    """Expose login stage latency histograms in the Prometheus text format."""
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    has_token = bool(METRICS_TOKEN) and secrets.compare_digest(token, METRICS_TOKEN)
+    if not has_token and not (current_user.is_authenticated and current_user.is_admin):
+        abort(404)
+    return Response(latency_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/login', methods=['GET'])
 def login_selector():
     """Render the login selector page."""
@@ -1118,26 +1118,31 @@ def get_user_stats():
 @sio.event
 def connect(sid, environ):
     print('Client connected:', sid)
+    # Resolve the same conversation the HTTP route uses from the session cookie
+    try:
+        with app.request_context(environ):
+            key, user_id = _chatbot_session_key()
+    except Exception as e:
+        print(f"[ERROR] Could not resolve chatbot session for {sid}: {str(e)}")
+        key, user_id = chatbot_session_service.session_key(sid), None
+    sio.save_session(sid, {'chatbot_key': key, 'user_id': user_id})
 
 @sio.event
 def disconnect(sid):
     print('Client disconnected:', sid)
+    chatbot_engine.disconnect(sid)
 
 @sio.event
 def chat_message(sid, data):
-    # Simple rule-based chatbot responses
-    message = data.get('message', '').lower()
-    
-    if 'hi' in message or 'hello' in message:
-        response = "Hi there! How can I help you today?"
-    elif 'stress' in message or 'anxious' in message:
-        response = "I understand things can be tough sometimes. Would you like to try some breathing exercises?"
-    elif 'well' in message or 'good' in message:
-        response = "That's great to hear! What's making you feel good today?"
-    else:
-        response = "I'm here to listen. What would you like to talk about?"
-    
-    sio.emit('chat_response', {'message': response})
+    # Replies go to the originating connection only
+    if not chatbot_engine.allow(sid):
+        sio.emit('chat_response', {'error': 'rate_limited',
+                                   'message': "You're sending messages too quickly. Please wait a moment."}, to=sid)
+        return
+    message = data.get('message', '') if isinstance(data, dict) else ''
+    sio_session = sio.get_session(sid)
+    result = chatbot_engine.respond(sio_session['chatbot_key'], message, sio_session['user_id'])
+    sio.emit('chat_response', {'message': result['reply'], 'topic': result['topic']}, to=sid)
 
 
 # Admin routes are now handled by the admin Blueprint
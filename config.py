@@ -1,4 +1,5 @@
 import os
+import threading
 from dotenv import load_dotenv
 from supabase import create_client, Client
 # Load environment variables from .env file
@@ -9,14 +10,84 @@ SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
+# Request timeout for the PostgREST and Storage sub-clients
+SUPABASE_HTTP_TIMEOUT = float(os.getenv('SUPABASE_HTTP_TIMEOUT', 10))
+
+# Process-wide client registry keyed by (pid, role). The pid is part of the key
+# so that forked gunicorn workers never share sockets inherited from the master.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _build_client_options(**overrides):
+    """Build client options with the configured timeouts, when supported.
+
+    No httpx client is injected: postgrest, storage and gotrue each rewrite
+    base_url and headers on the client they are given, so sharing one would
+    send PostgREST requests to the storage URL. Each sub-client keeps its
+    own keep-alive pool, and reusing the Client keeps those pools warm.
+    """
+    try:
+        from supabase.lib.client_options import SyncClientOptions
+
+        return SyncClientOptions(
+            postgrest_client_timeout=SUPABASE_HTTP_TIMEOUT,
+            storage_client_timeout=SUPABASE_HTTP_TIMEOUT,
+            **overrides,
+        )
+    except (ImportError, TypeError):
+        # Older supabase-py releases use their built-in defaults
+        return None
+
+
+def _create_client(key: str, **overrides) -> Client:
+    options = _build_client_options(**overrides)
+    if options is not None:
+        return create_client(SUPABASE_URL, key, options=options)
+    return create_client(SUPABASE_URL, key)
+
+
 # Initialize Supabase client
 def init_supabase(service_role=False) -> Client:
+    """Return the shared Supabase client for the given role.
+
+    Clients are created lazily on first use and then reused for the lifetime of
+    the worker process, so every caller shares the same keep-alive connections.
+    """
     if not all([SUPABASE_URL, SUPABASE_KEY,SUPABASE_SERVICE_ROLE_KEY]):
         raise ValueError("Missing Supabase credentials. Please check your .env file.")
-    
-    key = SUPABASE_SERVICE_ROLE_KEY if service_role else SUPABASE_KEY
 
-    print(f"[Supabase] Initializing client. Service Role: {service_role} key:{key}")
-    
-    return create_client(SUPABASE_URL, key)
+    role = 'service_role' if service_role else 'anon'
+    registry_key = (os.getpid(), role)
+
+    client = _clients.get(registry_key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(registry_key)
+        if client is None:
+            key = SUPABASE_SERVICE_ROLE_KEY if service_role else SUPABASE_KEY
+            print(f"[Supabase] Initializing shared client. Role: {role} pid: {os.getpid()}")
+            client = _create_client(key)
+            _clients[registry_key] = client
+    return client
+
+
+def init_supabase_auth() -> Client:
+    """Return a new anon client for signing users in, outside the registry.
+
+    Signing in replaces the Authorization header of the client it runs on
+    with the user's JWT, so it must never run on the shared anon client.
+    The session is neither persisted nor refreshed; callers keep one client
+    per thread so concurrent sign-ins don't share session state.
+    """
+    if not all([SUPABASE_URL, SUPABASE_KEY]):
+        raise ValueError("Missing Supabase credentials. Please check your .env file.")
+    return _create_client(SUPABASE_KEY, persist_session=False, auto_refresh_token=False)
+
 
+def reset_supabase_clients():
+    """Drop all cached clients (e.g. after a fork or credential rotation)."""
+    with _clients_lock:
+        _clients.clear()
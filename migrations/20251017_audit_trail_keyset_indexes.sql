@@ -0,0 +1,17 @@
+-- Indexes backing keyset pagination of the audit trail viewer
+-- (ORDER BY timestamp DESC, id DESC with optional user/action/resource_type filters
+-- and timestamp ranges)
+CREATE INDEX IF NOT EXISTS idx_audit_trail_timestamp_id
+    ON public.audit_trail ("timestamp" DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_audit_trail_user_timestamp
+    ON public.audit_trail (user_id, "timestamp" DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_audit_trail_action_timestamp
+    ON public.audit_trail (action, "timestamp" DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_audit_trail_resource_timestamp
+    ON public.audit_trail (resource_type, "timestamp" DESC, id DESC);
+
+-- Keep planner statistics fresh so estimated counts stay close to reality
+ANALYZE public.audit_trail;
@@ -0,0 +1,222 @@
+-- Monthly range partitioning of audit_trail on "timestamp"
+-- Created: 2025-10-17
+--
+-- Hot queries (the viewer only ever reads recent pages) are pruned to the
+-- newest partitions, and the retention job (services/audit_archive_service.py)
+-- archives and drops whole months instead of running large DELETEs.
+
+BEGIN;
+
+ALTER TABLE public.audit_trail RENAME TO audit_trail_unpartitioned;
+
+CREATE TABLE public.audit_trail (
+    LIKE public.audit_trail_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED
+) PARTITION BY RANGE ("timestamp");
+
+-- The partition key has to be part of the primary key
+ALTER TABLE public.audit_trail ALTER COLUMN "timestamp" SET NOT NULL;
+ALTER TABLE public.audit_trail ALTER COLUMN "timestamp" SET DEFAULT now();
+ALTER TABLE public.audit_trail ADD PRIMARY KEY (id, "timestamp");
+
+-- Rows outside every monthly partition land here instead of failing the insert
+CREATE TABLE public.audit_trail_default PARTITION OF public.audit_trail DEFAULT;
+
+-- Create the partition holding the month that contains for_month (idempotent).
+-- Rows of that month already in the default partition are moved into the new
+-- table before it is attached; otherwise the attach would violate the default
+-- partition's constraint and fail.
+CREATE OR REPLACE FUNCTION public.audit_trail_create_partition(for_month DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+DECLARE
+    month_start DATE := date_trunc('month', for_month)::DATE;
+    month_end DATE := (date_trunc('month', for_month) + INTERVAL '1 month')::DATE;
+    partition_name TEXT := format('audit_trail_y%sm%s', to_char(month_start, 'YYYY'), to_char(month_start, 'MM'));
+BEGIN
+    IF to_regclass(format('public.%I', partition_name)) IS NULL THEN
+        EXECUTE format('CREATE TABLE public.%I (LIKE public.audit_trail INCLUDING DEFAULTS)', partition_name);
+        EXECUTE format(
+            'WITH moved AS (
+                 DELETE FROM public.audit_trail_default
+                 WHERE "timestamp" >= %L AND "timestamp" < %L
+                 RETURNING *
+             )
+             INSERT INTO public.%I SELECT * FROM moved',
+            month_start, month_end, partition_name
+        );
+        EXECUTE format(
+            'ALTER TABLE public.audit_trail ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, month_start, month_end
+        );
+    END IF;
+    RETURN partition_name;
+END;
+$$;
+
+-- Make sure the current month and the next months_ahead months have a partition
+CREATE OR REPLACE FUNCTION public.audit_trail_ensure_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS SETOF TEXT
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+    SELECT public.audit_trail_create_partition(month::DATE)
+    FROM generate_series(
+        date_trunc('month', now()),
+        date_trunc('month', now()) + make_interval(months => GREATEST(months_ahead, 0)),
+        INTERVAL '1 month'
+    ) AS month;
+$$;
+
+-- Monthly partitions with their bounds and the planner's row estimate
+CREATE OR REPLACE FUNCTION public.audit_trail_partitions()
+RETURNS TABLE (partition_name TEXT, month_start DATE, month_end DATE, estimated_rows BIGINT)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+    SELECT
+        child.relname::TEXT,
+        to_date(substring(child.relname FROM 'y(\d{4})m(\d{2})$'), 'YYYYMM'),
+        (to_date(substring(child.relname FROM 'y(\d{4})m(\d{2})$'), 'YYYYMM') + INTERVAL '1 month')::DATE,
+        GREATEST(child.reltuples, 0)::BIGINT
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+    WHERE ns.nspname = 'public'
+      AND parent.relname = 'audit_trail'
+      AND child.relname ~ '^audit_trail_y\d{4}m\d{2}$'
+    ORDER BY 2;
+$$;
+
+-- Detach and drop one month once the retention job has archived it.
+-- Refuses the current month so live inserts are never affected.
+CREATE OR REPLACE FUNCTION public.audit_trail_drop_partition(for_month DATE)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+DECLARE
+    month_start DATE := date_trunc('month', for_month)::DATE;
+    partition_name TEXT := format('audit_trail_y%sm%s', to_char(month_start, 'YYYY'), to_char(month_start, 'MM'));
+BEGIN
+    IF month_start >= date_trunc('month', now())::DATE THEN
+        RAISE EXCEPTION 'Refusing to drop current or future audit_trail partition %', partition_name;
+    END IF;
+    IF to_regclass(format('public.%I', partition_name)) IS NULL THEN
+        RETURN FALSE;
+    END IF;
+    EXECUTE format('ALTER TABLE public.audit_trail DETACH PARTITION public.%I', partition_name);
+    EXECUTE format('DROP TABLE public.%I', partition_name);
+    RETURN TRUE;
+END;
+$$;
+
+-- One partition per month that already has rows, plus the months ahead
+DO $$
+DECLARE
+    month TIMESTAMPTZ;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE((SELECT MIN("timestamp") FROM public.audit_trail_unpartitioned), now())),
+            date_trunc('month', now()),
+            INTERVAL '1 month'
+        )
+    LOOP
+        PERFORM public.audit_trail_create_partition(month::DATE);
+    END LOOP;
+    PERFORM public.audit_trail_ensure_partitions(3);
+END $$;
+
+INSERT INTO public.audit_trail
+SELECT * FROM public.audit_trail_unpartitioned;
+
+-- Keep a serial id's sequence alive when the old table is dropped. Identity
+-- sequences can't change owner; those ids get a new sequence further down.
+DO $$
+DECLARE
+    id_sequence TEXT := pg_get_serial_sequence('public.audit_trail_unpartitioned', 'id');
+    id_is_identity BOOLEAN := (
+        SELECT attidentity <> '' FROM pg_attribute
+        WHERE attrelid = 'public.audit_trail_unpartitioned'::regclass AND attname = 'id'
+    );
+BEGIN
+    IF id_sequence IS NOT NULL AND NOT id_is_identity THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY public.audit_trail.id', id_sequence);
+    END IF;
+END $$;
+
+-- Carry row level security and its policies over to the new table
+DO $$
+DECLARE
+    policy RECORD;
+BEGIN
+    IF (SELECT relrowsecurity FROM pg_class WHERE oid = 'public.audit_trail_unpartitioned'::regclass) THEN
+        ALTER TABLE public.audit_trail ENABLE ROW LEVEL SECURITY;
+    END IF;
+    FOR policy IN
+        SELECT * FROM pg_policies WHERE schemaname = 'public' AND tablename = 'audit_trail_unpartitioned'
+    LOOP
+        EXECUTE format(
+            'CREATE POLICY %I ON public.audit_trail AS %s FOR %s TO %s%s%s',
+            policy.policyname, policy.permissive, policy.cmd, array_to_string(policy.roles, ', '),
+            CASE WHEN policy.qual IS NOT NULL THEN format(' USING (%s)', policy.qual) ELSE '' END,
+            CASE WHEN policy.with_check IS NOT NULL THEN format(' WITH CHECK (%s)', policy.with_check) ELSE '' END
+        );
+    END LOOP;
+END $$;
+
+DROP TABLE public.audit_trail_unpartitioned;
+
+-- LIKE copies id's NOT NULL but not identity (the Supabase default), and
+-- AuditTrailModel never sends an id. Give an integer id without a default
+-- its own sequence, continuing after the copied rows.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'audit_trail' AND column_name = 'id'
+          AND column_default IS NULL AND data_type IN ('smallint', 'integer', 'bigint')
+    ) THEN
+        CREATE SEQUENCE public.audit_trail_id_seq OWNED BY public.audit_trail.id;
+        ALTER TABLE public.audit_trail ALTER COLUMN id SET DEFAULT nextval('public.audit_trail_id_seq');
+        PERFORM setval('public.audit_trail_id_seq', COALESCE((SELECT MAX(id) FROM public.audit_trail), 0) + 1, false);
+        GRANT USAGE, SELECT ON SEQUENCE public.audit_trail_id_seq TO authenticated, service_role;
+    END IF;
+END $$;
+
+-- Keyset pagination indexes (see 20251017_audit_trail_keyset_indexes.sql),
+-- now created once on the parent and inherited by every partition
+CREATE INDEX IF NOT EXISTS idx_audit_trail_timestamp_id
+    ON public.audit_trail ("timestamp" DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_audit_trail_user_timestamp
+    ON public.audit_trail (user_id, "timestamp" DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_audit_trail_action_timestamp
+    ON public.audit_trail (action, "timestamp" DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_audit_trail_resource_timestamp
+    ON public.audit_trail (resource_type, "timestamp" DESC, id DESC);
+
+GRANT SELECT, INSERT ON public.audit_trail TO authenticated, service_role;
+
+REVOKE ALL ON FUNCTION public.audit_trail_create_partition(DATE) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.audit_trail_ensure_partitions(INTEGER) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.audit_trail_partitions() FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.audit_trail_drop_partition(DATE) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.audit_trail_create_partition(DATE) TO service_role;
+GRANT EXECUTE ON FUNCTION public.audit_trail_ensure_partitions(INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION public.audit_trail_partitions() TO service_role;
+GRANT EXECUTE ON FUNCTION public.audit_trail_drop_partition(DATE) TO service_role;
+
+COMMIT;
+
+ANALYZE public.audit_trail;
@@ -0,0 +1,13 @@
+-- Persistent chatbot memory for logged-in users (last topic and extracted facts).
+-- Anonymous conversations are kept only in the app's in-memory session store.
+CREATE TABLE IF NOT EXISTS public.chatbot_memory (
+    user_id UUID PRIMARY KEY REFERENCES public.user_accounts(id) ON DELETE CASCADE,
+    last_topic TEXT,
+    facts JSONB NOT NULL DEFAULT '{}'::JSONB,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE public.chatbot_memory IS 'Server-side chatbot conversation memory, one row per user';
+
+-- Only the backend (service role) reads and writes this table
+ALTER TABLE public.chatbot_memory ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,56 @@
+-- Indexed full-text search over content_management (author, messages)
+-- Created: 2025-10-17
+-- Uses the 'simple' configuration because content mixes English and Tagalog,
+-- so no language-specific stemming or stop words are applied.
+
+-- 1. One immutable expression shared by the index and the search function
+CREATE OR REPLACE FUNCTION public.content_search_vector(author TEXT, messages TEXT)
+RETURNS TSVECTOR
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+SET search_path = public, pg_temp
+AS $$
+    SELECT setweight(to_tsvector('simple'::regconfig, COALESCE(author, '')), 'A')
+        || setweight(to_tsvector('simple'::regconfig, COALESCE(messages, '')), 'B');
+$$;
+
+-- 2. Expression GIN index (no extra column, so select('*') payloads are unchanged)
+CREATE INDEX IF NOT EXISTS idx_content_management_search
+    ON public.content_management
+    USING GIN (public.content_search_vector(author, messages));
+
+-- 3. Ranked, prefix-matching, paginated search
+-- Every word of search_query must match the start of a word in author or messages.
+CREATE OR REPLACE FUNCTION public.search_content(
+    search_query TEXT,
+    filter_is_active BOOLEAN DEFAULT NULL,
+    filter_category TEXT DEFAULT NULL,
+    filter_content_type TEXT DEFAULT NULL,
+    result_limit INTEGER DEFAULT 50,
+    result_offset INTEGER DEFAULT 0
+)
+RETURNS SETOF public.content_management
+LANGUAGE sql
+STABLE
+SET search_path = public, pg_temp
+AS $$
+    WITH terms AS (
+        SELECT to_tsquery('simple'::regconfig, string_agg(term || ':*', ' & ')) AS query
+        FROM regexp_split_to_table(lower(COALESCE(search_query, '')), '[^[:alnum:]]+') AS term
+        WHERE term <> ''
+    )
+    SELECT c.*
+    FROM public.content_management c, terms
+    WHERE terms.query IS NOT NULL
+      AND public.content_search_vector(c.author, c.messages) @@ terms.query
+      AND (filter_is_active IS NULL OR c.is_active = filter_is_active)
+      AND (filter_category IS NULL OR c.category = filter_category)
+      AND (filter_content_type IS NULL OR c.content_type = filter_content_type)
+    ORDER BY ts_rank_cd(public.content_search_vector(c.author, c.messages), terms.query) DESC,
+             c.created_at DESC
+    LIMIT LEAST(GREATEST(result_limit, 1), 200)
+    OFFSET GREATEST(result_offset, 0);
+$$;
+
+GRANT EXECUTE ON FUNCTION public.search_content(TEXT, BOOLEAN, TEXT, TEXT, INTEGER, INTEGER) TO authenticated, service_role;
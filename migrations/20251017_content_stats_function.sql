@@ -0,0 +1,31 @@
+-- All content_management counters in one round trip for ContentRepoService.get_content_stats
+-- Created: 2025-10-17
+CREATE OR REPLACE FUNCTION public.content_stats()
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SET search_path = public, pg_temp
+AS $$
+    WITH grouped AS (
+        SELECT
+            COALESCE(category, 'unspecified') AS category,
+            COALESCE(content_type, 'unspecified') AS content_type,
+            COALESCE(target_audience, 'unspecified') AS target_audience,
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE is_active IS TRUE) AS active,
+            COUNT(*) FILTER (WHERE is_active IS FALSE) AS inactive
+        FROM public.content_management
+        GROUP BY 1, 2, 3
+    )
+    SELECT jsonb_build_object(
+        'total', COALESCE(SUM(total), 0),
+        'active', COALESCE(SUM(active), 0),
+        'inactive', COALESCE(SUM(inactive), 0),
+        'by_category', COALESCE((SELECT jsonb_object_agg(category, n) FROM (SELECT category, SUM(total) AS n FROM grouped GROUP BY category) c), '{}'::JSONB),
+        'by_content_type', COALESCE((SELECT jsonb_object_agg(content_type, n) FROM (SELECT content_type, SUM(total) AS n FROM grouped GROUP BY content_type) t), '{}'::JSONB),
+        'by_target_audience', COALESCE((SELECT jsonb_object_agg(target_audience, n) FROM (SELECT target_audience, SUM(total) AS n FROM grouped GROUP BY target_audience) a), '{}'::JSONB)
+    )
+    FROM grouped;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.content_stats() TO authenticated, service_role;
@@ -0,0 +1,30 @@
+-- Atomic failed-login accounting: one round trip per failed login
+-- Created: 2025-10-17
+
+-- user_accounts (AuthService.process_login): count a failed attempt unless the
+-- account is already locked, and report the counter before and after.
+CREATE OR REPLACE FUNCTION public.record_failed_login(
+    p_email TEXT,
+    p_role TEXT,
+    p_max_attempts INTEGER DEFAULT 5
+)
+RETURNS TABLE (previous_attempts INTEGER, failed_attempts INTEGER, locked BOOLEAN)
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+    WITH target AS (
+        SELECT id, COALESCE(failed_attempt, 0) AS attempts
+        FROM public.user_accounts
+        WHERE email = lower(trim(p_email)) AND role = p_role
+        FOR UPDATE
+    )
+    UPDATE public.user_accounts AS accounts
+    SET failed_attempt = CASE WHEN target.attempts >= p_max_attempts THEN target.attempts ELSE target.attempts + 1 END
+    FROM target
+    WHERE accounts.id = target.id
+    RETURNING target.attempts, accounts.failed_attempt, accounts.failed_attempt >= p_max_attempts;
+$$;
+
+REVOKE ALL ON FUNCTION public.record_failed_login(TEXT, TEXT, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.record_failed_login(TEXT, TEXT, INTEGER) TO service_role;
@@ -0,0 +1,23 @@
+-- Column metadata for SchemaService, loaded once at startup in one round trip
+-- Created: 2025-10-17
+CREATE OR REPLACE FUNCTION public.schema_columns(p_tables TEXT[])
+RETURNS TABLE (table_name TEXT, column_name TEXT, data_type TEXT, is_nullable BOOLEAN, has_default BOOLEAN)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+    SELECT
+        c.table_name::TEXT,
+        c.column_name::TEXT,
+        c.data_type::TEXT,
+        c.is_nullable = 'YES',
+        c.column_default IS NOT NULL OR c.is_identity = 'YES'
+    FROM information_schema.columns c
+    WHERE c.table_schema = 'public'
+      AND c.table_name = ANY (p_tables)
+    ORDER BY c.table_name, c.ordinal_position;
+$$;
+
+REVOKE ALL ON FUNCTION public.schema_columns(TEXT[]) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.schema_columns(TEXT[]) TO service_role;
@@ -0,0 +1,9 @@
+-- Indexes backing the keyset-paginated user management listing
+-- (ORDER BY created_at DESC, id DESC with optional role/status filters)
+CREATE INDEX IF NOT EXISTS idx_user_accounts_listing
+    ON public.user_accounts (created_at DESC, id DESC)
+    WHERE is_deleted = false;
+
+CREATE INDEX IF NOT EXISTS idx_user_accounts_role_listing
+    ON public.user_accounts (role, created_at DESC, id DESC)
+    WHERE is_deleted = false;
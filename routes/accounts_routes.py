@@ -14,7 +14,8 @@ from flask_login import current_user, login_required, login_url, login_user, log
 from werkzeug.security import check_password_hash, generate_password_hash
 from forms import RegisterForm
 from models.accounts import AccountsModel,PsychologistDetailModel
-from utils.audit_decorator import audit_action
+from utils.audit_decorator import audit_action, log_audit
+from utils.export import iter_keyset, export_response
 
 # Add the project root to the Python path first
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -22,12 +23,13 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 # Now import the accounts repository service
-from services.accounts_reposervice import account_repo_service
+from services.accounts_reposervice import account_repo_service, USER_EXPORT_COLUMNS
 from services.auth_service import auth_service
+from services.background_jobs import background_jobs
 
 # Import Supabase client
-from supabase import create_client, Client
-from config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_ROLE_KEY
+from supabase import Client
+from config import init_supabase
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,9 +43,9 @@ accounts_bp = Blueprint(
     url_prefix='/accounts'
 )
 
-# Initialize Supabase client
+# Shared Supabase client from the process-wide registry
 try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase: Client = init_supabase()
 except Exception as e:
     print(f"[ERROR] Failed to initialize Supabase client: {str(e)}")
     supabase = None
@@ -59,41 +61,13 @@ def management():
     print(f"[DEBUG] is_admin: {getattr(current_user, 'is_admin', False)}")
     
     try:
-      users_result = account_repo_service.get_all_accounts();
-      users_data = users_result.data if hasattr(users_result, "data") else []
-      
-      # Count users created in the current month
-      # Get current year and month
-      now = datetime.now()
-      current_year = now.year
-      current_month = now.month
-      
-      from dateutil import parser
-      
-      new_users_count = len([
-          user for user in users_data
-          if user.get('created_at') and
-            parser.parse(user['created_at']).year == current_year and
-            parser.parse(user['created_at']).month == current_month
-      ])
-      
-      user_counts = len(users_data)
-      active_counts = sum(1 for user in users_data if user.get('is_active', True))
-      pending_counts = sum(1 for user in users_data if not user.get('is_verified', True))
-      
-      # Count users object
-      user_counts = {
-        'total_users': user_counts,
-        'active_counts': active_counts,
-        'new_users_count': new_users_count,
-        'pending_counts': pending_counts
-      }
+      # Counters come from head-only count queries; rows are paged via /users/data
+      user_counts = account_repo_service.get_account_counts()
 
       auditResp = audit_action("viewed user management", "AccountsModel")(lambda: None)()
       print(f"[DEBUG] Audit log response: {auditResp}")
 
       return render_template('accounts/user_management.html',
-        users= users_data,
         user_counts=user_counts,
         current_user=current_user)
       
@@ -330,18 +304,12 @@ def bulk_delete():
   if not isinstance(user_ids, list) or not user_ids:
     return jsonify({'error': 'Invalid or empty user_ids list.'}), 400
   
-  success_cnt = 0
-  fail_cnt = 0
   try:
-    for user_id in user_ids:
-      try:
-        account_repo_service.delete_account(user_id)
-        success_cnt += 1
-      except Exception as e:
-        print(f"[ERROR] Failed to delete user {user_id}: {str(e)}")
-        fail_cnt += 1
-        continue
-
+    outcome = account_repo_service.delete_accounts(user_ids)
+    # One audit entry for the whole operation rather than one per user
+    log_audit("bulk delete user management", "AccountsModel", details=outcome)
+    success_cnt = len(outcome['succeeded'])
+    fail_cnt = len(outcome['not_found']) + len(outcome['failed'])
     return jsonify({'message': 'Users deleted successfully.', 'success': success_cnt, 'fail': fail_cnt}), 200
   except Exception as e:
     print(f"[ERROR] Failed to bulk delete user statuses: {str(e)}")
@@ -383,9 +351,15 @@ def bulk_set_user_status():
     return jsonify({'error': 'Invalid status value.'}), 400
 
   try:
-    for user_id in user_ids:
-      account_repo_service.update_account(user_id, {"is_active": status == "active"})
-    return jsonify({'message': 'User statuses updated successfully.'}), 200
+    outcome = account_repo_service.set_active(user_ids, status == "active")
+    # One audit entry for the whole operation rather than one per user
+    log_audit("bulk set status user management", "AccountsModel",
+              details={'status': status, **outcome})
+    if outcome['failed']:
+      print(f"[ERROR] Bulk status update failed for {len(outcome['failed'])} users")
+    return jsonify({'message': 'User statuses updated successfully.',
+                    'success': len(outcome['succeeded']),
+                    'fail': len(outcome['not_found']) + len(outcome['failed'])}), 200
   except Exception as e:
     print(f"[ERROR] Failed to bulk update user statuses: {str(e)}")
     return jsonify({'error': 'Failed to bulk update user statuses.'}), 500
@@ -453,14 +427,45 @@ def modal_view_user(user_id):
 
 @accounts_bp.route('/users/data')
 def users_data():
-  # Query your users and return as JSON
-  result = account_repo_service.get_all_accounts();
-  users = result.data if hasattr(result, "data") else []
+  """Return one keyset-paginated page of the user grid as rendered rows."""
+  try:
+    page = account_repo_service.list_accounts_page(
+      limit=request.args.get('limit', type=int),
+      cursor=request.args.get('cursor'),
+      role=request.args.get('role'),
+      status=request.args.get('status'),
+      search=request.args.get('q')
+    )
+  except ValueError:
+    return jsonify({'error': 'Invalid cursor'}), 400
   
   # Render table rows as HTML using Jinja2
-  table_rows = render_template('accounts/user_table_list.html', users=users)
+  table_rows = render_template('accounts/user_table_list.html', users=page['users'])
   
-  return jsonify({'html': table_rows})
+  return jsonify({
+    'html': table_rows,
+    'next_cursor': page['next_cursor'],
+    'has_more': page['has_more']
+  })
+
+@accounts_bp.route('/users/export')
+@login_required
+@audit_action("exported user accounts", "AccountsModel")
+def users_export():
+  """Stream the filtered user list as CSV or JSONL (?format=csv|jsonl)."""
+  if getattr(current_user, 'role', None) != 'admin':
+    return jsonify({'error': 'Access denied'}), 403
+
+  role = request.args.get('role')
+  status = request.args.get('status')
+  search = request.args.get('q')
+  print(f"[DEBUG] Streaming user export - role: {role}, status: {status}, q: {search}")
+
+  rows = iter_keyset(
+    lambda: account_repo_service.filtered_accounts_query(', '.join(USER_EXPORT_COLUMNS), role, status, search),
+    'created_at'
+  )
+  return export_response(rows, request.args.get('format', 'csv'), USER_EXPORT_COLUMNS, 'user_accounts')
 
 @accounts_bp.route('/user/send_verification/<user_id>', methods=['POST'])
 @login_required
@@ -487,17 +492,11 @@ def send_verification_email(user_id):
         
         print(f"[DEBUG] Sending verification email to: {email}")
         
-        # Send verification email via Supabase
-        response = auth_service.send_verification_email(email)
-        
-        print(f"[DEBUG] Supabase response: {response}")
-        
-         # Check for errors in the response
-        if response and hasattr(response, 'error') and response.error:
-            print(f"[ERROR] Supabase send verification error: {response.error}")
-            return jsonify({'error': 'Failed to send verification email.'}), 500
+        # Supabase sends the email from the background queue, with retries
+        background_jobs.submit(account_repo_service.send_verification_when_ready, user_data.get('user_id'), email,
+                               description=f"Verification email for {email}")
         
-        print(f"[DEBUG] Verification email sent to: {email}")
+        print(f"[DEBUG] Verification email queued for: {email}")
         return jsonify({'message': 'Verification email sent successfully.', 'status': 'success'}), 200
 
     except Exception as e:
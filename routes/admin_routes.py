@@ -5,7 +5,7 @@ import secrets
 import string
 import sys
 import traceback
-from datetime import datetime, timedelta
+from datetime import timedelta
 from functools import wraps
 
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, abort, session
@@ -32,11 +32,12 @@ from forms.base_forms import (
 from forms.psychologist_form import PsychologistForm
 from forms.guidance_counselor_form import CreateGuidanceCounselorForm
 from services.auth_service import auth_service
+from utils.login_limiter import login_limiter
+from services.dashboard_stats_service import dashboard_stats_service
 
 # Import Supabase client
-from supabase import create_client, Client
-from config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_ROLE_KEY
-import pytz
+from supabase import Client
+from config import init_supabase
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,9 +51,9 @@ admin_bp = Blueprint(
     url_prefix='/admin'
 )
 
-# Initialize Supabase client
+# Shared Supabase client from the process-wide registry
 try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase: Client = init_supabase()
 except Exception as e:
     print(f"[ERROR] Failed to initialize Supabase client: {str(e)}")
     supabase = None
@@ -86,41 +87,6 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def login_limiter(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):   
-        print("\n[DEBUG] ====== login_limiter decorator called ======")   
-        current_time = datetime.now(pytz.utc)
-        
-        # Initialize session variables if they don't exist
-        if 'login_attempts' not in session:
-            session['login_attempts'] = 0
-            session['first_attempt'] = current_time.timestamp()
-        
-        # Reset attempts if more than 5 minutes have passed since first attempt
-        time_since_first_attempt = current_time.timestamp() - session['first_attempt']
-        if time_since_first_attempt > 300:  # 5 minutes in seconds
-            session['login_attempts'] = 0
-            session['first_attempt'] = current_time.timestamp()
-        
-        # Check if too many attempts (increased to 10 for development)
-        max_attempts = 10  # Increased from 5 to 10
-        if session.get('login_attempts', 0) >= max_attempts:
-            time_left = int(300 - time_since_first_attempt)  # Time left in seconds
-            minutes, seconds = divmod(time_left, 60)
-            flash(f'Too many login attempts. Please try again in {minutes}m {seconds}s.', 'danger')
-            return redirect(url_for('login_selector')), 429  # 429: Too Many Requests
-        
-        # Increment login attempts
-        session['login_attempts'] = session.get('login_attempts', 0) + 1
-        session.modified = True
-        
-        # Log the attempt
-        print(f"[LOGIN] Login attempt {session['login_attempts']}/{max_attempts} from {request.remote_addr}")
-        
-        return f(*args, **kwargs)
-    return decorated_function
-
 @admin_bp.route('/login', methods=['GET'])
 def user_login():
     """Render the user login page."""
@@ -252,70 +218,13 @@ def dashboard():
         logout_user()
         return redirect(url_for('main.index'))
         
-    total_users = 0
-    new_users = 0
-    total_active_users = 0
-    recent_activity = []
-    
-    try:
-        # Initialize Supabase client
-        supabase = db_service.get_supabase_client()
-        
-        # Fetch client statistics
-        print("[DEBUG] Fetching client statistics...")
-        clients_response = supabase.table('clients').select('*').execute()
-        
-        if hasattr(clients_response, 'data'):
-            clients = clients_response.data if clients_response.data else []
-            total_users = len(clients)
-            print(f"[DEBUG] Found {total_users} total users")
-        else:
-            clients = []
-            total_users = 0
-            print("[WARNING] No client data found")
-            
-        # Calculate new users (last 7 days)
-        one_week_ago = (datetime.utcnow() - timedelta(days=7)).strftime('%Y-%m-%d')
-        new_users = len([u for u in clients 
-                        if u.get('created_at') 
-                        and (isinstance(u['created_at'], str) and datetime.strptime(u['created_at'].split('T')[0], '%Y-%m-%d') >= datetime.strptime(one_week_ago, '%Y-%m-%d')
-                             or not isinstance(u['created_at'], str) and u['created_at'].date() >= datetime.strptime(one_week_ago, '%Y-%m-%d').date())])
-        
-        # Get recent activity (last 10 logins)
-        try:
-            login_activity = supabase.table('clients')\
-                .select('*')\
-                .order('last_login', desc=True)\
-                .limit(10)\
-                .execute()
-            
-            if hasattr(login_activity, 'data'):
-                recent_activity = login_activity.data
-                print(f"[DEBUG] Found {len(recent_activity)} recent logins")
-        except Exception as e:
-            print(f"[WARNING] Could not fetch recent activity: {str(e)}")
-            recent_activity = []
-            
-        # Get active users (last 24 hours)
-        try:
-            one_day_ago = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
-            active_users = supabase.table('clients')\
-                .select('id', count='exact')\
-                .not_.is_('last_login', 'null')\
-                .gte('last_login', one_day_ago)\
-                .execute()
-                
-            if hasattr(active_users, 'count') and active_users.count is not None:
-                total_active_users = active_users.count
-            else:
-                total_active_users = 0
-        except Exception as e:
-            print(f"[WARNING] Could not fetch active users: {str(e)}")
-            total_active_users = 0
-            
-    except Exception as e:
-        print(f"[ERROR] Error in dashboard data fetching: {str(e)}")
-        # Use default values set at the beginning of the function
+    # Counters come from head-only count queries, cached for a short window
+    stats = dashboard_stats_service.get_dashboard_stats()
+    total_users = stats['total_users']
+    new_users = stats['new_users']
+    total_active_users = stats['total_active_users']
+    recent_activity = stats['recent_activity']
+    print(f"[DEBUG] Dashboard stats - total: {total_users}, new: {new_users}, active: {total_active_users}")
     
     # Prepare recent activity data with serializable timestamps
     serialized_activity = []
@@ -396,153 +305,12 @@ def debug_db():
 @login_required
 @admin_required
 def manage_users():
-    """Manage all users (admin, client, psychologist, staff)."""
-    print("\n[DEBUG] ====== manage_users route called ======")
-    print(f"[DEBUG] Request URL: {request.url}")
-    print(f"[DEBUG] Current user: {current_user}")
-    print(f"[DEBUG] is_authenticated: {current_user.is_authenticated}")
-    print(f"[DEBUG] is_admin: {getattr(current_user, 'is_admin', False)}")
-    
-    def process_user_list(users, user_type):
-        """Helper function to process and validate user lists."""
-        processed = []
-        if not isinstance(users, list):
-            print(f"[WARNING] Expected list for {user_type}, got {type(users).__name__}")
-            return processed
-            
-        for user in users:
-            try:
-                if not isinstance(user, dict):
-                    user = dict(user) if hasattr(user, '__dict__') else {}
-                    if not user:
-                        continue
-                
-                # Ensure required fields exist with defaults
-                user.setdefault('first_name', 'Unknown')
-                user.setdefault('last_name', 'User')
-                user.setdefault('email', 'No email')
-                user.setdefault('user_type', user_type)
-                user.setdefault('is_active', True)
-                user.setdefault('created_at', datetime.utcnow())
-                
-                # Ensure all string fields are properly encoded
-                for key, value in user.items():
-                    if isinstance(value, str):
-                        user[key] = value.strip()
-                    elif value is None:
-                        user[key] = ''
-                
-                processed.append(user)
-                
-            except Exception as e:
-                print(f"[ERROR] Error processing {user_type} user: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                continue
-                
-        return processed
-    
-    try:
-        # Initialize empty lists for all user types
-        clients = []
-        psychologists = []
-        admins = []
-        guidance_counselors = []
-        
-        # Get all user types with error handling
-        try:
-            clients_data = db_service.get_all_users() or []
-            clients = process_user_list(clients_data, 'client')
-            print(f"[DEBUG] Processed {len(clients)} clients")
-        except Exception as e:
-            print(f"[ERROR] Error processing clients: {str(e)}")
-            import traceback
-            traceback.print_exc()
-        
-        try:
-            psychs_data = db_service.get_all_psychologists() or []
-            psychologists = process_user_list(psychs_data, 'psychologist')
-            for psych in psychologists:
-                psych.update({
-                    'is_admin': False,
-                    'is_psychologist': True,
-                    'is_super_admin': False
-                })
-            print(f"[DEBUG] Processed {len(psychologists)} psychologists")
-        except Exception as e:
-            print(f"[ERROR] Error processing psychologists: {str(e)}")
-            traceback.print_exc()
-            
-        try:
-            admins_data = db_service.get_all_admins() or []
-            admins = process_user_list(admins_data, 'admin')
-            for admin in admins:
-                admin.update({
-                    'is_admin': True,
-                    'is_psychologist': False,
-                    'is_super_admin': admin.get('is_super_admin', False)
-                })
-            print(f"[DEBUG] Processed {len(admins)} admins")
-        except Exception as e:
-            print(f"[ERROR] Error processing admins: {str(e)}")
-            traceback.print_exc()
-            
-        try:
-            gcs_data = db_service.get_all_guidance_counselors() or []
-            guidance_counselors = process_user_list(gcs_data, 'guidance_counselor')
-            for gc in guidance_counselors:
-                gc.update({
-                    'is_admin': False,
-                    'is_psychologist': False,
-                    'is_super_admin': False,
-                    'is_active': gc.get('is_active', gc.get('is_available', True))
-                })
-            print(f"[DEBUG] Processed {len(guidance_counselors)} guidance counselors")
-        except Exception as e:
-            print(f"[ERROR] Error processing guidance counselors: {str(e)}")
-            traceback.print_exc()
-        
-        # Combine all users
-        all_users = clients + psychologists + admins + guidance_counselors
-        
-        # Sort users by creation date (newest first)
-        try:
-            all_users.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-        except Exception as e:
-            print(f"[WARNING] Error sorting users by creation date: {str(e)}")
-            # Keep unsorted if there's an error
-        
-        # Count users by type
-        user_counts = {
-            'total': len(all_users),
-            'clients': len(clients),
-            'psychologists': len(psychologists),
-            'admins': len(admins),
-            'guidance_counselors': len(guidance_counselors)
-        }
-        
-        print(f"[INFO] Loaded {len(all_users)} total users ({user_counts['clients']} clients, "
-              f"{user_counts['psychologists']} psychologists, {user_counts['admins']} admins, "
-              f"{user_counts['guidance_counselors']} guidance counselors)")
-        
-        # Debug: Print first user of each type if available
-        for user_type, user_list in [('clients', clients), ('psychologists', psychologists),
-                                   ('admins', admins), ('guidance_counselors', guidance_counselors)]:
-            if user_list:
-                print(f"[DEBUG] First {user_type} user: {user_list[0].get('email', 'No email')}")
-        
-        return render_template('admin/user_management.html',
-                            users=all_users,
-                            user_counts=user_counts,
-                            current_user=current_user)
-    
-    except Exception as e:
-        error_msg = f"[CRITICAL] Unhandled exception in manage_users: {str(e)}"
-        print(error_msg)
-        import traceback
-        traceback.print_exc()
-        flash('An error occurred while loading user data. Please check the logs for details.', 'error')
-        return redirect(url_for('admin.dashboard'))
+    """Manage all users (admin, client, psychologist, staff).
+
+    The user grid is served by the accounts blueprint, which pages
+    user_accounts server-side instead of loading every user table here.
+    """
+    return redirect(url_for('accounts.management', **request.args))
     
 
 @admin_bp.route('/create-admin', methods=['GET', 'POST'])
@@ -1,10 +1,26 @@
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
-from services.audit_trail_reposervice import audit_trail_service
+from services.audit_trail_reposervice import audit_trail_service, parse_audit_date, AUDIT_PAGE_SIZE, AUDIT_MAX_PAGE_SIZE, AUDIT_EXPORT_COLUMNS
+from services.audit_archive_service import audit_archive_service
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify 
 from flask_login import current_user, login_required 
+from utils.audit_decorator import audit_action
+from utils.export import iter_keyset, export_response
 audit_bp = Blueprint('audit', __name__, template_folder='../templates/audit')
 
+def _audit_filters(args) -> dict:
+    """Audit filters from query args, shared by the live, export and archive views.
+
+    Raises ValueError when a date filter is malformed.
+    """
+    return {
+        'user_id': args.get('user_id', '').strip(),
+        'action': args.get('action', '').strip(),
+        'resource_type': args.get('resource_type', '').strip(),
+        'date_from': parse_audit_date(args.get('date_from', '').strip()),
+        'date_to': parse_audit_date(args.get('date_to', '').strip(), end_of_day=True)
+    }
+
 @audit_bp.route('/audit-trail')
 @login_required
 def audit_trail():
@@ -18,7 +34,7 @@ def audit_trail():
 @audit_bp.route('/audit-trail/data')
 @login_required
 def audit_trail_data():
-    """Get audit trail data via AJAX with pagination"""
+    """Get audit trail data via AJAX with keyset pagination and filters"""
     print(f"[DEBUG] audit_trail_data route accessed")
     
     if not getattr(current_user, 'role') == 'admin':
@@ -26,41 +42,107 @@ def audit_trail_data():
     
     try:
         # Get pagination parameters
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 25, type=int)  # Default 25 items per page
+        per_page = min(max(request.args.get('per_page', AUDIT_PAGE_SIZE, type=int), 1), AUDIT_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor') or None
         
-        # Calculate offset
-        offset = (page - 1) * per_page
+        try:
+            filters = _audit_filters(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid date filter, expected YYYY-MM-DD'}), 400
         
-        print(f"[DEBUG] Pagination - Page: {page}, Per page: {per_page}, Offset: {offset}")
+        print(f"[DEBUG] Pagination - Per page: {per_page}, Cursor: {cursor}, Filters: {filters}")
         
-        # Get audit trails with pagination
-        audit_trails = audit_trail_service.get_all_audit_trails(limit=per_page, offset=offset)
+        # Get one page of audit trails after the cursor
+        page = audit_trail_service.get_audit_trails_page(limit=per_page, cursor=cursor, filters=filters)
         
-        # Get total count for pagination info
-        total_count = audit_trail_service.get_audit_trails_count()
-        total_pages = (total_count + per_page - 1) // per_page  # Ceiling division
+        # Estimated total, cached per filter combination
+        total_count = audit_trail_service.count_audit_trails(filters)
         
-        print(f"[DEBUG] Retrieved {len(audit_trails)} audit trails, Total: {total_count}, Pages: {total_pages}")
+        print(f"[DEBUG] Retrieved {len(page['audit_trails'])} audit trails, Estimated total: {total_count}")
         
         return jsonify({
-            'audit_trails': audit_trails,
+            'audit_trails': page['audit_trails'],
             'pagination': {
-                'current_page': page,
                 'per_page': per_page,
                 'total_items': total_count,
-                'total_pages': total_pages,
-                'has_prev': page > 1,
-                'has_next': page < total_pages,
-                'prev_page': page - 1 if page > 1 else None,
-                'next_page': page + 1 if page < total_pages else None
+                'total_is_estimate': True,
+                'has_next': page['has_more'],
+                'next_cursor': page['next_cursor']
             }
         })
         
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         print(f"[ERROR] Error in audit_trail_data: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@audit_bp.route('/audit-trail/export')
+@login_required
+@audit_action("exported audit trail", "AuditTrailModel")
+def audit_trail_export():
+    """Stream the filtered audit trail as CSV or JSONL (?format=csv|jsonl)"""
+    if not getattr(current_user, 'role') == 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    try:
+        filters = _audit_filters(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid date filter, expected YYYY-MM-DD'}), 400
+    
+    print(f"[DEBUG] Streaming audit trail export - Filters: {filters}")
+    rows = iter_keyset(lambda: audit_trail_service.filtered_audit_query(filters), 'timestamp')
+    return export_response(rows, request.args.get('format', 'csv'), AUDIT_EXPORT_COLUMNS, 'audit_trail')
+
+@audit_bp.route('/audit-trail/archive')
+@login_required
+def audit_trail_archive_months():
+    """List the months that were moved out of the live table into archives"""
+    if not getattr(current_user, 'role') == 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify({
+        'months': audit_archive_service.list_archived_months(),
+        'retention_months': audit_archive_service.retention_months
+    })
+
+@audit_bp.route('/audit-trail/archive/<month>')
+@login_required
+def audit_trail_archive_data(month):
+    """Query one archived month (YYYY-MM) with the same filters as the live data"""
+    if not getattr(current_user, 'role') == 'admin':
+        return jsonify({'error': 'Access denied'}), 403
+    
+    try:
+        per_page = min(max(request.args.get('per_page', AUDIT_PAGE_SIZE, type=int), 1), AUDIT_MAX_PAGE_SIZE)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        try:
+            filters = _audit_filters(request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid date filter, expected YYYY-MM-DD'}), 400
+        
+        page = audit_archive_service.query_archive(month, filters=filters, limit=per_page, offset=offset)
+        
+        return jsonify({
+            'month': month,
+            'audit_trails': page['audit_trails'],
+            'pagination': {
+                'per_page': per_page,
+                'offset': offset,
+                'has_next': page['has_more'],
+                'next_offset': offset + per_page if page['has_more'] else None
+            }
+        })
+        
+    except FileNotFoundError:
+        return jsonify({'error': f'No archive for {month}'}), 404
+    except ValueError:
+        return jsonify({'error': 'Invalid month, expected YYYY-MM'}), 400
+    except Exception as e:
+        print(f"[ERROR] Error in audit_trail_archive_data: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @audit_bp.route('/audit-trail/user/<user_id>')
 @login_required
 def user_audit_trail(user_id):
@@ -1,9 +1,14 @@
 import logging
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import current_user, login_required
-from services.content_reposervice import content_repo_service
+from services.content_reposervice import (
+  content_repo_service, CONTENT_SEARCH_PAGE_SIZE, CONTENT_SEARCH_MAX_PAGE_SIZE, CONTENT_LIST_COLUMNS
+)
+from services.random_content_service import random_content_service
 from forms.content_forms import ContentForm, ContentSearchForm
 import uuid
+import json
+import hashlib
 from datetime import datetime
 
 # Configure logging
@@ -72,6 +77,81 @@ def list_contents():
     logger.error(f"Error retrieving content list: {str(e)}")
     return jsonify({'error': 'Failed to retrieve content list'}), 500
 
+@content_bp.route('/stats')
+@login_required
+def content_stats():
+  """Get content counters (cached, single query) as JSON."""
+  if not current_user.is_authenticated or current_user.role not in ['admin','staff']:
+    return jsonify({'error': 'Access denied'}), 403
+
+  return jsonify(content_repo_service.get_content_stats())
+
+@content_bp.route('/random')
+def random_content():
+  """Get one random active content item for the inspiration feed."""
+  try:
+    user_id = current_user.id if current_user.is_authenticated else None
+    content = random_content_service.get_random_content(user_id)
+    if not content:
+      return jsonify({'error': 'No content available'}), 404
+    return jsonify(content)
+  except Exception as e:
+    logger.error(f"Error retrieving random content: {str(e)}")
+    return jsonify({'error': 'Failed to retrieve content'}), 500
+
+@content_bp.route('/rows')
+@login_required
+def content_rows():
+  """Get one page of content rows as JSON for the client-rendered grid.
+
+  Responses carry an ETag; a request whose If-None-Match matches gets an
+  empty 304 so unchanged pages aren't re-sent.
+  """
+  if not current_user.is_authenticated or current_user.role not in ['admin','staff']:
+    return jsonify({'error': 'Access denied. Your role does not have permission to view this content.'}), 403
+
+  try:
+    limit = min(max(request.args.get('limit', 25, type=int), 1), CONTENT_SEARCH_MAX_PAGE_SIZE)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    search_query = request.args.get('q', '').strip()
+
+    filters = {}
+    status_filter = request.args.get('status')
+    if status_filter == 'active':
+      filters['is_active'] = True
+    elif status_filter == 'inactive':
+      filters['is_active'] = False
+    if request.args.get('category'):
+      filters['category'] = request.args.get('category')
+    if request.args.get('content_type'):
+      filters['content_type'] = request.args.get('content_type')
+
+    if search_query:
+      # Ranked search doesn't count matches; total is only known once the last page is reached.
+      # One extra row is fetched to detect a next page, so it has to fit under the repo's clamp.
+      limit = min(limit, CONTENT_SEARCH_MAX_PAGE_SIZE - 1)
+      result = content_repo_service.search_contents(search_query, filters, limit=limit + 1, offset=offset)
+      rows = result.data if result and result.data else []
+      has_more = len(rows) > limit
+      rows = [{column: row.get(column) for column in CONTENT_LIST_COLUMNS} for row in rows[:limit]]
+      total = None if has_more else offset + len(rows)
+    else:
+      page = content_repo_service.list_contents_page(filters, limit=limit, offset=offset)
+      rows, total = page['rows'], page['total']
+      has_more = offset + len(rows) < total
+
+    payload = {'rows': rows, 'total': total, 'offset': offset, 'limit': limit, 'has_more': has_more}
+    etag = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+      response = current_app.response_class(status=304)
+    else:
+      response = jsonify(payload)
+    response.set_etag(etag)
+    return response
+  except Exception as e:
+    logger.error(f"Error retrieving content rows: {str(e)}")
+    return jsonify({'error': 'Failed to retrieve content list'}), 500
+
 @content_bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add_content():
@@ -310,8 +390,11 @@ def search_content():
     filters = {k: v for k, v in filters.items() if v}
     
     if search_query:
-      result = content_repo_service.search_contents(search_query, filters)
+      limit = min(max(request.args.get('limit', CONTENT_SEARCH_PAGE_SIZE, type=int), 1), CONTENT_SEARCH_MAX_PAGE_SIZE)
+      offset = max(request.args.get('offset', 0, type=int), 0)
+      result = content_repo_service.search_contents(search_query, filters, limit=limit, offset=offset)
     else:
+      limit, offset = None, 0
       result = content_repo_service.get_all_contents(filters)
     
     contents = result.data if result and result.data else []
@@ -319,12 +402,32 @@ def search_content():
     # Render table rows as HTML
     table_rows = render_template('content_table_list.html', contents=contents)
     
-    return jsonify({'html': table_rows, 'count': len(contents)})
+    response = {'html': table_rows, 'count': len(contents)}
+    if limit is not None:
+      # A full page means there may be more matches after it
+      response['next_offset'] = offset + len(contents) if len(contents) >= limit else None
+    return jsonify(response)
     
   except Exception as e:
     logger.error(f"Error searching content: {str(e)}")
     return jsonify({'error': str(e)}), 500
 
+def _bulk_result(outcome: dict, verb: str):
+  """Shape a bulk repository outcome into the JSON the content page expects."""
+  success_count = len(outcome['succeeded'])
+  failed_ids = outcome['not_found'] + outcome['failed']
+  message = f"Successfully {verb} {success_count} items"
+  if failed_ids:
+    message += f", {len(failed_ids)} failed"
+  logger.info(f"Bulk {verb} completed by {current_user.email}: {success_count} success, {len(failed_ids)} failed")
+  return jsonify({
+    'success': True,
+    'message': message,
+    'success_count': success_count,
+    'failed_count': len(failed_ids),
+    'failed_ids': failed_ids
+  })
+
 @content_bp.route('/bulk-activate', methods=['POST'])
 @login_required
 def bulk_activate():
@@ -339,26 +442,8 @@ def bulk_activate():
     if not content_ids:
       return jsonify({'error': 'No content IDs provided'}), 400
     
-    success_count = 0
-    failed_count = 0
-    
-    for content_id in content_ids:
-      try:
-        result = content_repo_service.activate_content(content_id)
-        if result:
-          success_count += 1
-        else:
-          failed_count += 1
-      except Exception as e:
-        logger.error(f"Error activating content {content_id}: {str(e)}")
-        failed_count += 1
-    
-    message = f"Successfully activated {success_count} items"
-    if failed_count > 0:
-      message += f", {failed_count} failed"
-    
-    logger.info(f"Bulk activation completed by {current_user.email}: {success_count} success, {failed_count} failed")
-    return jsonify({'success': True, 'message': message, 'success_count': success_count, 'failed_count': failed_count})
+    outcome = content_repo_service.set_contents_active(content_ids, True)
+    return _bulk_result(outcome, 'activated')
     
   except Exception as e:
     logger.error(f"Error in bulk activation: {str(e)}")
@@ -378,26 +463,8 @@ def bulk_deactivate():
     if not content_ids:
       return jsonify({'error': 'No content IDs provided'}), 400
     
-    success_count = 0
-    failed_count = 0
-    
-    for content_id in content_ids:
-      try:
-        result = content_repo_service.inactive_content(content_id)
-        if result:
-          success_count += 1
-        else:
-          failed_count += 1
-      except Exception as e:
-        logger.error(f"Error deactivating content {content_id}: {str(e)}")
-        failed_count += 1
-    
-    message = f"Successfully deactivated {success_count} items"
-    if failed_count > 0:
-      message += f", {failed_count} failed"
-    
-    logger.info(f"Bulk deactivation completed by {current_user.email}: {success_count} success, {failed_count} failed")
-    return jsonify({'success': True, 'message': message, 'success_count': success_count, 'failed_count': failed_count})
+    outcome = content_repo_service.set_contents_active(content_ids, False)
+    return _bulk_result(outcome, 'deactivated')
     
   except Exception as e:
     logger.error(f"Error in bulk deactivation: {str(e)}")
@@ -417,26 +484,8 @@ def bulk_delete():
     if not content_ids:
       return jsonify({'error': 'No content IDs provided'}), 400
     
-    success_count = 0
-    failed_count = 0
-    
-    for content_id in content_ids:
-      try:
-        result = content_repo_service.delete_content(content_id)
-        if result:
-          success_count += 1
-        else:
-          failed_count += 1
-      except Exception as e:
-        logger.error(f"Error deleting content {content_id}: {str(e)}")
-        failed_count += 1
-    
-    message = f"Successfully deleted {success_count} items"
-    if failed_count > 0:
-      message += f", {failed_count} failed"
-    
-    logger.info(f"Bulk deletion completed by {current_user.email}: {success_count} success, {failed_count} failed")
-    return jsonify({'success': True, 'message': message, 'success_count': success_count, 'failed_count': failed_count})
+    outcome = content_repo_service.delete_contents(content_ids)
+    return _bulk_result(outcome, 'deleted')
     
   except Exception as e:
     logger.error(f"Error in bulk deletion: {str(e)}")
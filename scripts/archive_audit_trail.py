@@ -0,0 +1,46 @@
+"""Audit trail retention job.
+
+Archives every monthly audit_trail partition older than the retention window
+to gzip-compressed JSONL under AUDIT_ARCHIVE_DIR, then drops the partition.
+Also creates the partitions for the coming months. Run it daily from cron.
+
+Usage:
+    python scripts/archive_audit_trail.py                   # archive and drop
+    python scripts/archive_audit_trail.py --dry-run         # only list what would be archived
+    python scripts/archive_audit_trail.py --keep-partitions # archive without dropping
+    python scripts/archive_audit_trail.py --retention-months 6
+
+Exits with status 1 when any month could not be archived.
+"""
+import os
+import sys
+import json
+import argparse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.audit_archive_service import audit_archive_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and drop audit_trail partitions past retention")
+    parser.add_argument('--retention-months', type=int, help="months kept in the live table (default AUDIT_RETENTION_MONTHS)")
+    parser.add_argument('--dry-run', action='store_true', help="only report the partitions that would be archived")
+    parser.add_argument('--keep-partitions', action='store_true', help="write archives but do not drop partitions")
+    args = parser.parse_args()
+
+    if args.retention_months:
+        audit_archive_service.retention_months = max(1, args.retention_months)
+
+    summary = audit_archive_service.run_retention(dry_run=args.dry_run, drop=not args.keep_partitions)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Benchmark and regression check for chatbot_rules.get_bot_response.
+
+Replays corpus.json (English and Tagalog messages covering every intent
+branch, crisis phrases and long rambling inputs), compares each
+(reply, topic, facts) result against golden.json and reports p50/p99
+latency and messages per second.
+
+Usage:
+    python scripts/chatbot_bench/bench_chatbot.py                  # check + benchmark
+    python scripts/chatbot_bench/bench_chatbot.py --rounds 500     # longer benchmark
+    python scripts/chatbot_bench/bench_chatbot.py --update-golden  # accept current output
+
+Exits with status 1 when any result differs from the golden file.
+"""
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(BENCH_DIR))
+sys.path.insert(0, project_root)
+
+from chatbot_rules import get_bot_response
+
+CORPUS_PATH = os.path.join(BENCH_DIR, 'corpus.json')
+GOLDEN_PATH = os.path.join(BENCH_DIR, 'golden.json')
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding='utf-8') as corpus_file:
+        cases = json.load(corpus_file)
+    for case in cases:
+        # Long inputs are stored as a repeated chunk to keep the corpus readable
+        case['text'] = case['message'] * case.get('repeat', 1) + case.get('suffix', '')
+        case.setdefault('last_topic', None)
+        case.setdefault('facts', {})
+    return cases
+
+
+def run_case(case):
+    # Facts are mutated by the bot, so every call gets a fresh copy
+    reply, topic, facts = get_bot_response(case['text'], case['last_topic'], copy.deepcopy(case['facts']))
+    return {'reply': reply, 'topic': topic, 'facts': facts}
+
+
+def check_golden(cases, golden):
+    mismatches = []
+    for case in cases:
+        expected = golden.get(case['id'])
+        actual = run_case(case)
+        if expected != actual:
+            mismatches.append((case['id'], expected, actual))
+    return mismatches
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def benchmark(cases, rounds, warmup=1):
+    for _ in range(warmup):
+        for case in cases:
+            run_case(case)
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for case in cases:
+            t0 = time.perf_counter()
+            get_bot_response(case['text'], case['last_topic'], copy.deepcopy(case['facts']))
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'messages': len(latencies),
+        'elapsed_s': elapsed,
+        'msgs_per_s': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_us': percentile(latencies, 50) * 1e6,
+        'p99_us': percentile(latencies, 99) * 1e6,
+        'max_us': latencies[-1] * 1e6 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and regression-check the chatbot response path")
+    parser.add_argument('--rounds', type=int, default=200, help="times the whole corpus is replayed")
+    parser.add_argument('--update-golden', action='store_true', help="rewrite golden.json from the current output")
+    parser.add_argument('--skip-bench', action='store_true', help="only run the golden comparison")
+    args = parser.parse_args()
+
+    cases = load_corpus()
+
+    if args.update_golden:
+        golden = {case['id']: run_case(case) for case in cases}
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as golden_file:
+            json.dump(golden, golden_file, indent=2, ensure_ascii=False, sort_keys=True)
+            golden_file.write('\n')
+        print(f"Wrote {len(golden)} golden results to {GOLDEN_PATH}")
+        return 0
+
+    with open(GOLDEN_PATH, encoding='utf-8') as golden_file:
+        golden = json.load(golden_file)
+
+    mismatches = check_golden(cases, golden)
+    for case_id, expected, actual in mismatches:
+        print(f"[MISMATCH] {case_id}")
+        print(f"  expected: {json.dumps(expected, ensure_ascii=False)}")
+        print(f"  actual:   {json.dumps(actual, ensure_ascii=False)}")
+    print(f"Golden check: {len(cases) - len(mismatches)}/{len(cases)} cases match")
+
+    if not args.skip_bench:
+        stats = benchmark(cases, args.rounds)
+        print(f"Messages: {stats['messages']} in {stats['elapsed_s']:.3f}s "
+              f"({stats['msgs_per_s']:.0f} msg/s)")
+        print(f"Latency: p50 {stats['p50_us']:.1f}us  p99 {stats['p99_us']:.1f}us  max {stats['max_us']:.1f}us")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
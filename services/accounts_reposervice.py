@@ -1,11 +1,55 @@
 import os
+import base64
+import json
 from config import init_supabase
 from supabase import Client
 from models.accounts import AccountsModel
 from datetime import datetime, timezone
-import time
+from utils.cache import TTLCache
+from utils.export import keyset_filter, validate_keyset_position
+from services.background_jobs import background_jobs, RetryJob
+
+# Identity cache settings for flask-login's user_loader
+IDENTITY_CACHE_TTL = float(os.getenv('IDENTITY_CACHE_TTL', 60))
+IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 2048))
+
+# Columns rendered by the user management grid (accounts/user_table_list.html)
+USER_LIST_COLUMNS = 'id, user_id, first_name, last_name, email, role, is_active, is_verified, image, last_login_at, created_at'
+USER_LIST_PAGE_SIZE = 25
+USER_LIST_MAX_PAGE_SIZE = 100
+# Columns written by the user export (no avatar image or credentials)
+USER_EXPORT_COLUMNS = ('id', 'user_id', 'first_name', 'last_name', 'email', 'role', 'is_active',
+                       'is_verified', 'last_login_at', 'created_at')
+# Failed logins before an account is locked (see AuthService.process_login)
+MAX_FAILED_LOGIN_ATTEMPTS = int(os.getenv('MAX_FAILED_LOGIN_ATTEMPTS', 5))
+# Seconds before the first verification email attempt after an account is created
+VERIFICATION_EMAIL_DELAY = float(os.getenv('VERIFICATION_EMAIL_DELAY', 0.5))
+# User ids per in_() filter for bulk status/delete updates
+ACCOUNT_BULK_CHUNK_SIZE = int(os.getenv('ACCOUNT_BULK_CHUNK_SIZE', 100))
+
+def encode_cursor(row: dict) -> str:
+  """Encode the (created_at, id) keyset position of a row as an opaque cursor."""
+  raw = json.dumps([row.get('created_at'), row.get('id')])
+  return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+  """Decode a cursor produced by encode_cursor into (created_at, id).
+
+  Raises ValueError for anything that isn't a well-formed position.
+  """
+  try:
+    created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+  except Exception:
+    raise ValueError("Malformed cursor")
+  return validate_keyset_position(created_at, row_id)
+
+def _search_term(value: str) -> str:
+  # Strip characters that are reserved in PostgREST logic filters
+  return ''.join(ch for ch in (value or '') if ch not in ',()"*%\\').strip()
+
 class AccountRepoService:
   def __init__(self):
+    self.identity_cache = TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
     try:
       self.supabase: Client = init_supabase(False)
       self.supabase_role: Client = init_supabase(True)
@@ -50,11 +94,10 @@ class AccountRepoService:
       
         result = self.supabase.table('user_accounts').insert(accounts_data).execute()
         
-        # Send verification email via Supabase
-        time.sleep(2)  # Wait for 2 seconds to ensure user creation is fully processed
-        from services.auth_service import auth_service
-        response = auth_service.send_verification_email(account.email)
-        print(f"[DEBUG] Supabase email verification response: {response}")
+        # Verification email goes out from the background queue once the auth user is ready
+        background_jobs.submit(self.send_verification_when_ready, user_id, account.email,
+                               delay=VERIFICATION_EMAIL_DELAY,
+                               description=f"Verification email for {account.email}")
         
         return user_id
     else:
@@ -63,6 +106,21 @@ class AccountRepoService:
       
             
   
+  def send_verification_when_ready(self, user_id: str, email: str):
+    """Background job: send the verification email once the auth user is visible.
+
+    Raises RetryJob while the user isn't readable yet or Supabase rejects the
+    send, so BackgroundJobQueue retries it with backoff.
+    """
+    from services.auth_service import auth_service
+    if auth_service.get_auth_user_by_id(user_id) is None:
+      raise RetryJob(f"auth user {user_id} not ready yet")
+    response = auth_service.send_verification_email(email)
+    print(f"[DEBUG] Supabase email verification response: {response}")
+    if not response.get('success'):
+      raise RetryJob(response.get('error') or 'verification email not sent')
+    return response
+
   def create_psychologist_detail(self, psychologist_detail):
     psychologist_data = {
       "user_id": psychologist_detail.user_id,
@@ -89,10 +147,12 @@ class AccountRepoService:
     return response
 
   def update_account(self, id: str, account):
-    return (self.supabase.table('user_accounts')
+    result = (self.supabase.table('user_accounts')
                 .update(account)
                 .eq('user_id', id)
                 .execute())
+    self.invalidate_cached_account(id)
+    return result
     
   def update_psychologist_detail(self, user_id: str, details):
     return (self.supabase.table('psychologists')
@@ -101,11 +161,46 @@ class AccountRepoService:
                 .execute())
 
   def delete_account(self, id: str):
-    return (self.supabase.table('user_accounts')
+    result = (self.supabase.table('user_accounts')
                 .update({'is_deleted': True})
                 .eq('user_id', id)
                 .execute())
+    self.invalidate_cached_account(id)
+    return result
   
+  def _bulk_update(self, user_ids, values: dict) -> dict:
+    """Apply one update per chunk of user ids and sort the ids by outcome.
+
+    Returns {'succeeded', 'not_found', 'failed'} lists of user ids, based on
+    the rows PostgREST returns for each chunk.
+    """
+    outcome = {'succeeded': [], 'not_found': [], 'failed': []}
+    unique_ids = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+    for start in range(0, len(unique_ids), ACCOUNT_BULK_CHUNK_SIZE):
+      chunk = unique_ids[start:start + ACCOUNT_BULK_CHUNK_SIZE]
+      try:
+        result = (self.supabase.table('user_accounts')
+                    .update(values)
+                    .in_('user_id', chunk)
+                    .execute())
+      except Exception as e:
+        print(f"[ERROR] Bulk update {values} failed for {len(chunk)} users: {str(e)}")
+        outcome['failed'].extend(chunk)
+        continue
+      returned = {str(row.get('user_id')) for row in (result.data or [])}
+      for user_id in chunk:
+        self.invalidate_cached_account(user_id)
+        outcome['succeeded' if user_id in returned else 'not_found'].append(user_id)
+    return outcome
+
+  def delete_accounts(self, user_ids) -> dict:
+    """Soft-delete many accounts with chunked in_ updates."""
+    return self._bulk_update(user_ids, {'is_deleted': True})
+
+  def set_active(self, user_ids, is_active: bool) -> dict:
+    """Activate or deactivate many accounts with chunked in_ updates."""
+    return self._bulk_update(user_ids, {'is_active': bool(is_active)})
+
   def get_all_accounts(self):
     result = (self.supabase
                 .table('user_accounts')
@@ -114,12 +209,98 @@ class AccountRepoService:
                 .execute())
     return result
   
+  def filtered_accounts_query(self, columns: str = USER_LIST_COLUMNS, role: str = None,
+                              status: str = None, search: str = None):
+    """Select columns of non-deleted accounts filtered by role, status and search term."""
+    query = (self.supabase.table('user_accounts')
+                .select(columns)
+                .eq('is_deleted', False))
+
+    if role:
+      query = query.eq('role', role.lower())
+    if status in ('active', 'inactive'):
+      query = query.eq('is_active', status == 'active')
+    elif status == 'pending':
+      query = query.eq('is_verified', False)
+
+    term = _search_term(search)
+    if term:
+      query = query.or_(f'first_name.ilike.*{term}*,last_name.ilike.*{term}*,email.ilike.*{term}*')
+    return query
+
+  def list_accounts_page(self, limit: int = USER_LIST_PAGE_SIZE, cursor: str = None,
+                         role: str = None, status: str = None, search: str = None):
+    """Return one page of accounts ordered by (created_at, id) descending.
+
+    Filtering by role, status (active/inactive/pending) and search term is done
+    by PostgREST, and only USER_LIST_COLUMNS are selected. Pass the returned
+    next_cursor back in to fetch the following page; a tampered cursor
+    raises ValueError.
+    """
+    limit = max(1, min(int(limit or USER_LIST_PAGE_SIZE), USER_LIST_MAX_PAGE_SIZE))
+
+    query = self.filtered_accounts_query(USER_LIST_COLUMNS, role, status, search)
+
+    if cursor:
+      query = query.or_(keyset_filter('created_at', *decode_cursor(cursor)))
+
+    # Fetch one extra row to know whether another page exists
+    result = (query.order('created_at', desc=True)
+                .order('id', desc=True)
+                .limit(limit + 1)
+                .execute())
+    rows = result.data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+      'users': rows,
+      'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+      'has_more': has_more
+    }
+
+  def get_account_counts(self):
+    """Return the user management counters using head-only count queries."""
+    def count(build_query):
+      query = (self.supabase.table('user_accounts')
+                  .select('id', count='exact', head=True)
+                  .eq('is_deleted', False))
+      return build_query(query).execute().count or 0
+
+    month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return {
+      'total_users': count(lambda query: query),
+      'active_counts': count(lambda query: query.eq('is_active', True)),
+      'new_users_count': count(lambda query: query.gte('created_at', month_start.isoformat())),
+      'pending_counts': count(lambda query: query.eq('is_verified', False))
+    }
+
   def get_account_by_user_id(self, user_id: str):
     return (self.supabase.table('user_accounts')
                 .select('*')
                 .eq('user_id', user_id)
                 .execute())
 
+  def get_cached_account(self, user_id: str):
+    """Return the user_accounts row for user_id, served from the identity cache when fresh."""
+    row = self.identity_cache.get(user_id)
+    if row is not None:
+      return row
+
+    result = self.get_account_by_user_id(user_id)
+    row = result.data[0] if result and result.data else None
+    if row:
+      self.identity_cache.set(user_id, row)
+    return row
+
+  def invalidate_cached_account(self, user_id: str):
+    self.identity_cache.invalidate(user_id)
+
+  def invalidate_cached_email(self, email: str):
+    email = (email or '').lower().strip()
+    self.identity_cache.invalidate_where(
+      lambda row: (row.get('email') or '').lower().strip() == email)
+
   def get_account_by_role(self, role: str):
     return (self.supabase.table('user_accounts')
                 .select("*")
@@ -133,13 +314,42 @@ class AccountRepoService:
                 .execute())
 
   def update_attempts(self, email: str, role: str, attempts: int):
-    return (self.supabase.table('user_accounts')
+    result = (self.supabase.table('user_accounts')
                 .update({'failed_attempt': attempts})
                 .eq('email', email)
                 .eq('role', role)
                 .execute()
     )
+    self.invalidate_cached_email(email)
+    return result
   
+  def record_failed_login(self, email: str, role: str, max_attempts: int = MAX_FAILED_LOGIN_ATTEMPTS):
+    """Count a failed login and apply the lockout in one round trip.
+
+    Returns {previous_attempts, failed_attempts, locked}, or None when no
+    account matches. The counter stops at max_attempts once locked.
+    """
+    email = email.lower().strip()
+    try:
+      result = self.supabase_role.rpc('record_failed_login', {
+        'p_email': email,
+        'p_role': role,
+        'p_max_attempts': max_attempts
+      }).execute()
+    except Exception as e:
+      # Function not deployed yet: fall back to read-then-update
+      print(f"[ERROR] record_failed_login RPC failed, falling back to read and update: {str(e)}")
+      account = self.get_account_by_email(email)
+      row = account.data[0] if account and account.data else None
+      if row is None:
+        return None
+      previous = row.get('failed_attempt') or 0
+      current = previous if previous >= max_attempts else previous + 1
+      self.update_attempts(email, role, current)
+      return {'previous_attempts': previous, 'failed_attempts': current, 'locked': current >= max_attempts}
+    self.invalidate_cached_email(email)
+    return result.data[0] if result.data else None
+
   def reset_attempts(self, email: str, role: str):
     now = datetime.now(timezone.utc).isoformat()
     results = (self.supabase.table('user_accounts')
@@ -149,6 +359,7 @@ class AccountRepoService:
                 .eq('role', role)
                 .execute()
     )
+    self.invalidate_cached_email(email)
     return results
     
   def get_psychologist_details(self, user_id: str):
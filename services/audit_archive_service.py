@@ -0,0 +1,225 @@
+import os
+import re
+import gzip
+import json
+import logging
+from datetime import date, datetime, timezone
+from config import init_supabase
+from services.audit_trail_reposervice import AUDIT_FILTER_COLUMNS
+from utils.export import keyset_filter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Months kept in the live audit_trail table, counting the current one
+AUDIT_RETENTION_MONTHS = int(os.getenv('AUDIT_RETENTION_MONTHS', 12))
+AUDIT_ARCHIVE_DIR = os.getenv('AUDIT_ARCHIVE_DIR', os.path.join(project_root, 'instance', 'audit_archive'))
+AUDIT_ARCHIVE_CHUNK_SIZE = int(os.getenv('AUDIT_ARCHIVE_CHUNK_SIZE', 1000))
+# Future monthly partitions created ahead of time by each retention run
+AUDIT_PARTITIONS_AHEAD = int(os.getenv('AUDIT_PARTITIONS_AHEAD', 3))
+
+ARCHIVE_FILE_PATTERN = re.compile(r'^audit_trail_(\d{4})_(\d{2})\.jsonl\.gz$')
+
+def parse_month(value) -> date:
+    """Parse 'YYYY-MM' (or a date) into the first day of that month. Raises ValueError."""
+    if isinstance(value, date):
+        return value.replace(day=1)
+    parsed = datetime.strptime(str(value)[:7], '%Y-%m')
+    return date(parsed.year, parsed.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _parse_timestamp(value):
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+class AuditArchiveService:
+  """Retention and archival of monthly audit_trail partitions.
+
+  audit_trail is range-partitioned by month (20251017_audit_trail_partitioning.sql).
+  run_retention() exports every partition older than the retention window to
+  a gzip-compressed JSONL file in AUDIT_ARCHIVE_DIR, checks the row count and
+  only then drops the partition. Archived months stay queryable through
+  query_archive(), which streams the file instead of touching the database.
+  """
+
+  def __init__(self, archive_dir: str = AUDIT_ARCHIVE_DIR, retention_months: int = AUDIT_RETENTION_MONTHS,
+               chunk_size: int = AUDIT_ARCHIVE_CHUNK_SIZE):
+    self.archive_dir = archive_dir
+    self.retention_months = max(1, retention_months)
+    self.chunk_size = chunk_size
+    try:
+      self.supabase = init_supabase(service_role=True)
+      print("[Supabase] Connection initialized in AuditArchiveService")
+    except Exception as e:
+      print(f"[Supabase] ❌ Failed to initialize in AuditArchiveService: {str(e)}")
+      self.supabase = None
+
+  def archive_path(self, month: date) -> str:
+    return os.path.join(self.archive_dir, f"audit_trail_{month:%Y_%m}.jsonl.gz")
+
+  def retention_cutoff(self, today: date = None) -> date:
+    """First month that is still kept in the live table."""
+    today = today or datetime.now(timezone.utc).date()
+    return add_months(today.replace(day=1), -(self.retention_months - 1))
+
+  # --- retention job -------------------------------------------------------
+
+  def list_partitions(self):
+    result = self.supabase.rpc('audit_trail_partitions').execute()
+    return result.data or []
+
+  def ensure_partitions(self, months_ahead: int = AUDIT_PARTITIONS_AHEAD):
+    result = self.supabase.rpc('audit_trail_ensure_partitions', {'months_ahead': months_ahead}).execute()
+    return result.data or []
+
+  def _iter_month_rows(self, month: date):
+    """Yield the live rows of one month in (timestamp, id) descending order, in keyset chunks."""
+    month_start, month_end = month.isoformat(), add_months(month, 1).isoformat()
+    position = None
+    while True:
+      query = (self.supabase.table('audit_trail')
+                   .select('*')
+                   .gte('timestamp', month_start)
+                   .lt('timestamp', month_end))
+      if position:
+        query = query.or_(keyset_filter('timestamp', *position))
+      rows = (query.order('timestamp', desc=True)
+                   .order('id', desc=True)
+                   .limit(self.chunk_size)
+                   .execute()).data or []
+      yield from rows
+      if len(rows) < self.chunk_size:
+        return
+      position = (rows[-1]['timestamp'], rows[-1]['id'])
+
+  def _count_month_rows(self, month: date) -> int:
+    result = (self.supabase.table('audit_trail')
+                  .select('id', count='exact', head=True)
+                  .gte('timestamp', month.isoformat())
+                  .lt('timestamp', add_months(month, 1).isoformat())
+                  .execute())
+    return result.count or 0
+
+  def archive_month(self, month) -> int:
+    """Write one month of audit_trail to its archive file and return the row count.
+
+    The file is written under a temporary name and renamed into place, so a
+    crash never leaves a truncated archive behind. Raises on any failure.
+    """
+    month = parse_month(month)
+    path = self.archive_path(month)
+    os.makedirs(self.archive_dir, exist_ok=True)
+    partial_path = f"{path}.partial"
+    written = 0
+    with gzip.open(partial_path, 'wt', encoding='utf-8') as archive_file:
+      for row in self._iter_month_rows(month):
+        archive_file.write(json.dumps(row, default=str) + '\n')
+        written += 1
+
+    expected = self._count_month_rows(month)
+    if written != expected:
+      os.remove(partial_path)
+      raise RuntimeError(f"Archive of {month:%Y-%m} has {written} rows but the partition has {expected}")
+    os.replace(partial_path, path)
+    logger.info(f"Archived {written} audit rows for {month:%Y-%m} to {path}")
+    return written
+
+  def run_retention(self, today: date = None, dry_run: bool = False, drop: bool = True) -> dict:
+    """Archive and drop every monthly partition older than the retention window."""
+    summary = {'cutoff': None, 'archived': {}, 'dropped': [], 'failed': {}, 'created': []}
+    if not self.supabase:
+      raise ConnectionError("Supabase client not initialized")
+
+    cutoff = self.retention_cutoff(today)
+    summary['cutoff'] = cutoff.isoformat()
+    if not dry_run:
+      # A failure here (e.g. a month that can't be split out of the default
+      # partition) is recorded, but doesn't stop archiving the old months
+      try:
+        summary['created'] = self.ensure_partitions()
+      except Exception as e:
+        logger.error(f"Failed to create upcoming audit partitions: {str(e)}")
+        summary['failed']['partitions'] = str(e)
+
+    for partition in self.list_partitions():
+      month = parse_month(partition['month_start'])
+      if month >= cutoff:
+        continue
+      label = f"{month:%Y-%m}"
+      if dry_run:
+        summary['archived'][label] = partition.get('estimated_rows')
+        continue
+      try:
+        summary['archived'][label] = self.archive_month(month)
+        if drop:
+          self.supabase.rpc('audit_trail_drop_partition', {'for_month': month.isoformat()}).execute()
+          summary['dropped'].append(label)
+      except Exception as e:
+        logger.error(f"Failed to archive audit partition {label}: {str(e)}")
+        summary['failed'][label] = str(e)
+    return summary
+
+  # --- archive reader ------------------------------------------------------
+
+  def list_archived_months(self):
+    """Return the archived months as 'YYYY-MM' strings, newest first."""
+    if not os.path.isdir(self.archive_dir):
+      return []
+    months = []
+    for name in os.listdir(self.archive_dir):
+      match = ARCHIVE_FILE_PATTERN.match(name)
+      if match:
+        months.append(f"{match.group(1)}-{match.group(2)}")
+    return sorted(months, reverse=True)
+
+  def iter_archived_rows(self, month, filters: dict = None):
+    """Stream the rows of an archived month that match filters, newest first.
+
+    Supports the same filters as AuditTrailService.get_audit_trails_page:
+    equality on user_id/action/resource_type and a [date_from, date_to) range.
+    """
+    path = self.archive_path(parse_month(month))
+    if not os.path.exists(path):
+      raise FileNotFoundError(f"No audit archive for {month}")
+
+    filters = filters or {}
+    equals = {column: str(filters[column]) for column in AUDIT_FILTER_COLUMNS if filters.get(column)}
+    date_from = _parse_timestamp(filters['date_from']) if filters.get('date_from') else None
+    date_to = _parse_timestamp(filters['date_to']) if filters.get('date_to') else None
+
+    with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+      for line in archive_file:
+        if not line.strip():
+          continue
+        row = json.loads(line)
+        if any(str(row.get(column)) != value for column, value in equals.items()):
+          continue
+        if date_from or date_to:
+          timestamp = _parse_timestamp(row.get('timestamp'))
+          if timestamp is None or (date_from and timestamp < date_from) or (date_to and timestamp >= date_to):
+            continue
+        yield row
+
+  def query_archive(self, month, filters: dict = None, limit: int = 25, offset: int = 0) -> dict:
+    """Return one page of an archived month: {audit_trails, has_more}."""
+    rows = []
+    has_more = False
+    for index, row in enumerate(self.iter_archived_rows(month, filters)):
+      if index < offset:
+        continue
+      if len(rows) == limit:
+        has_more = True
+        break
+      rows.append(row)
+    return {'audit_trails': rows, 'has_more': has_more}
+
+# Singleton instance
+audit_archive_service = AuditArchiveService()
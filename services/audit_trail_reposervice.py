@@ -1,17 +1,78 @@
+import os
+import base64
 from config import init_supabase
 from models.audit_trail import AuditTrailModel
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from utils.cache import TTLCache
+from utils.export import keyset_filter, validate_keyset_position
 import json
 
+AUDIT_PAGE_SIZE = 25
+AUDIT_MAX_PAGE_SIZE = 100
+# Audit totals are estimates refreshed at most this often per filter combination
+AUDIT_COUNT_TTL = float(os.getenv('AUDIT_COUNT_TTL', 300))
+AUDIT_FILTER_COLUMNS = ('user_id', 'action', 'resource_type')
+AUDIT_EXPORT_COLUMNS = ('id', 'timestamp', 'user_id', 'email_name', 'action', 'resource_type', 'resource_id',
+                        'ip_address', 'user_agent', 'session_id', 'details')
+
+def encode_audit_cursor(row: dict) -> str:
+    """Encode the (timestamp, id) keyset position of an audit row as an opaque cursor."""
+    raw = json.dumps([row.get('timestamp'), row.get('id')])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_audit_cursor(cursor: str):
+    """Decode a cursor produced by encode_audit_cursor into (timestamp, id).
+
+    Raises ValueError for anything that isn't a well-formed position.
+    """
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise ValueError("Malformed cursor")
+    return validate_keyset_position(timestamp, row_id)
+
+def parse_audit_date(value: str, end_of_day: bool = False):
+    """Parse a YYYY-MM-DD or ISO timestamp filter value into an ISO timestamp.
+
+    A bare date used as an upper bound is moved to the start of the next day,
+    so date ranges are inclusive. Raises ValueError on malformed input.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.isoformat()
+
 class AuditTrailService:
     def __init__(self):
         try:
             self.supabase = init_supabase()
+            self.count_cache = TTLCache(maxsize=256, ttl=AUDIT_COUNT_TTL)
             print("[DEBUG] AuditTrailService initialized successfully")
         except Exception as e:
             print(f"[ERROR] Failed to initialize AuditTrailService: {str(e)}")
             self.supabase = None
+            self.count_cache = TTLCache(maxsize=256, ttl=AUDIT_COUNT_TTL)
     
+    @staticmethod
+    def to_row(audit_data: AuditTrailModel) -> dict:
+        """Convert an AuditTrailModel into an audit_trail row"""
+        return {
+            'user_id': audit_data.user_id,
+            'action': audit_data.action,
+            'resource_type': audit_data.resource_type,
+            'resource_id': audit_data.resource_id,
+            'details': json.dumps(audit_data.details) if audit_data.details else None,
+            'ip_address': audit_data.ip_address,
+            'user_agent': audit_data.user_agent,
+            'timestamp': audit_data.timestamp.isoformat(),
+            'session_id': audit_data.session_id,
+            'email_name': audit_data.username
+        }
+
     def log_action(self, audit_data: AuditTrailModel):
         """Log an action to the audit trail"""
         try:
@@ -20,26 +81,8 @@ class AuditTrailService:
                 print("[ERROR] Supabase client not initialized")
                 return False
             
-            # Convert audit data to dictionary
-            audit_dict = {
-                'user_id': audit_data.user_id,
-                'action': audit_data.action,
-                'resource_type': audit_data.resource_type,
-                'resource_id': audit_data.resource_id,
-                'details': json.dumps(audit_data.details) if audit_data.details else None,
-                'ip_address': audit_data.ip_address,
-                'user_agent': audit_data.user_agent,
-                'timestamp': audit_data.timestamp.isoformat(),
-                'session_id': audit_data.session_id,
-                'email_name': audit_data.username
-            }
-            
-            print(f"[DEBUG-REPOSERVICE] Audit data to insert: {audit_dict}")
-            
             # Insert into audit_trail table
-            result = self.supabase.table('audit_trail').insert(audit_dict).execute()
-            
-            print(f"[DEBUG-REPOSERVICE] Supabase insert result: {result}")
+            result = self.supabase.table('audit_trail').insert(self.to_row(audit_data)).execute()
             
             if result.data:
                 print(f"[DEBUG] Audit trail logged: {audit_data.action} by {audit_data.user_id}")
@@ -51,6 +94,20 @@ class AuditTrailService:
         except Exception as e:
             print(f"[ERROR] Error logging audit trail: {str(e)}")
             return False
+
+    def log_actions(self, rows: list):
+        """Insert several audit_trail rows in a single multi-row insert.
+
+        Unlike log_action this raises on failure, so the caller can keep the
+        batch (see services.audit_writer).
+        """
+        if not rows:
+            return 0
+        if not self.supabase:
+            raise ConnectionError("Supabase client not initialized")
+
+        result = self.supabase.table('audit_trail').insert(rows).execute()
+        return len(result.data) if result.data else 0
     
     def get_user_audit_trail(self, user_id: str, limit: int = 50):
         """Get audit trail for a specific user"""
@@ -107,6 +164,86 @@ class AuditTrailService:
             print(f"[ERROR] Error getting all audit trails: {str(e)}")
             return []
     
+    def _apply_filters(self, query, filters: dict):
+        """Apply user/action/resource_type equality and [date_from, date_to) filters."""
+        for column in AUDIT_FILTER_COLUMNS:
+            if filters.get(column):
+                query = query.eq(column, filters[column])
+        if filters.get('date_from'):
+            query = query.gte('timestamp', filters['date_from'])
+        if filters.get('date_to'):
+            query = query.lt('timestamp', filters['date_to'])
+        return query
+
+    def filtered_audit_query(self, filters: dict = None, columns: str = '*'):
+        """Return an audit_trail select with filters applied, for keyset iteration."""
+        if not self.supabase:
+            raise ConnectionError("Supabase client not initialized")
+        return self._apply_filters(self.supabase.table('audit_trail').select(columns), filters or {})
+
+    def get_audit_trails_page(self, limit: int = AUDIT_PAGE_SIZE, cursor: str = None, filters: dict = None):
+        """Get one page of audit trails ordered by (timestamp, id) descending.
+
+        Keyset pagination: pass the returned next_cursor back in to fetch the
+        following page, so deep pages cost the same as the first one. A
+        tampered cursor raises ValueError.
+        """
+        filters = filters or {}
+        limit = max(1, min(int(limit or AUDIT_PAGE_SIZE), AUDIT_MAX_PAGE_SIZE))
+        page = {'audit_trails': [], 'next_cursor': None, 'has_more': False}
+        position = decode_audit_cursor(cursor) if cursor else None
+        try:
+            if not self.supabase:
+                print("[ERROR] Supabase service client not initialized")
+                return page
+
+            query = self._apply_filters(self.supabase.table('audit_trail').select('*'), filters)
+
+            if position:
+                query = query.or_(keyset_filter('timestamp', *position))
+
+            # Fetch one extra row to know whether another page exists
+            result = (query.order('timestamp', desc=True)
+                     .order('id', desc=True)
+                     .limit(limit + 1)
+                     .execute())
+            rows = result.data or []
+            page['has_more'] = len(rows) > limit
+            page['audit_trails'] = rows[:limit]
+            if page['has_more']:
+                page['next_cursor'] = encode_audit_cursor(page['audit_trails'][-1])
+            return page
+
+        except Exception as e:
+            print(f"[ERROR] Error getting audit trail page: {str(e)}")
+            return page
+
+    def count_audit_trails(self, filters: dict = None):
+        """Get an estimated count of audit trails matching filters.
+
+        Uses PostgREST's estimated count (exact for small results, planner
+        estimate for large ones) and caches it for AUDIT_COUNT_TTL seconds.
+        """
+        filters = filters or {}
+        cache_key = tuple(sorted((key, value) for key, value in filters.items() if value))
+        cached = self.count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            if not self.supabase:
+                print("[ERROR] Supabase service client not initialized")
+                return 0
+
+            query = self.supabase.table('audit_trail').select('id', count='estimated', head=True)
+            result = self._apply_filters(query, filters).execute()
+            total_count = result.count or 0
+            self.count_cache.set(cache_key, total_count)
+            return total_count
+
+        except Exception as e:
+            print(f"[ERROR] Error counting audit trails: {str(e)}")
+            return 0
+
     def get_audit_trails_count(self):
         """Get total count of audit trails"""
         try:
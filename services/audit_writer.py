@@ -0,0 +1,191 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from models.audit_trail import AuditTrailModel
+from services.audit_trail_reposervice import audit_trail_service, AuditTrailService
+
+try:
+  import fcntl
+except ImportError:  # Windows: only the in-process locks apply
+  fcntl = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 50))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 2.0))
+AUDIT_SPILL_PATH = os.getenv('AUDIT_SPILL_PATH', os.path.join(project_root, 'instance', 'audit_spill.jsonl'))
+
+@contextmanager
+def _file_lock(path: str, blocking: bool = True):
+  """Exclusive flock on path, shared by every worker process on the host.
+
+  Yields whether the lock was taken; with blocking=False it yields False
+  instead of waiting when another process holds it.
+  """
+  if fcntl is None:
+    yield True
+    return
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'a') as lock_file:
+    try:
+      fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+      yield False
+      return
+    try:
+      yield True
+    finally:
+      fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class AuditWriter:
+  """Background audit pipeline.
+
+  Audited requests only put a row on a bounded in-process queue. A daemon
+  worker drains it and writes multi-row inserts when AUDIT_BATCH_SIZE rows are
+  waiting or AUDIT_FLUSH_INTERVAL seconds have passed. Batches that can't be
+  written (database unreachable, queue full) are appended to a local JSONL
+  spill file and replayed after the next successful write. The spill file is
+  shared by all worker processes: appends hold an flock on <spill>.lock and
+  only the process holding <spill>.replay.lock replays, so rows are neither
+  interleaved nor inserted twice.
+  """
+
+  def __init__(self, service: AuditTrailService = audit_trail_service,
+               maxsize: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE,
+               flush_interval: float = AUDIT_FLUSH_INTERVAL, spill_path: str = AUDIT_SPILL_PATH):
+    self.service = service
+    self.batch_size = batch_size
+    self.flush_interval = flush_interval
+    self.spill_path = spill_path
+    self._queue = queue.Queue(maxsize=maxsize)
+    self._spill_lock = threading.Lock()
+    self._replay_lock = threading.Lock()
+    self._start_lock = threading.Lock()
+    self._stop = threading.Event()
+    self._worker = None
+    self._worker_pid = None
+    atexit.register(self.shutdown)
+
+  def _ensure_worker(self):
+    # Started lazily, and again in each forked worker process
+    if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+      return
+    with self._start_lock:
+      if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+        return
+      self._stop.clear()
+      self._worker = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+      self._worker_pid = os.getpid()
+      self._worker.start()
+
+  def enqueue(self, audit_data: AuditTrailModel) -> bool:
+    """Queue an audit entry without blocking the request."""
+    row = AuditTrailService.to_row(audit_data)
+    self._ensure_worker()
+    try:
+      self._queue.put_nowait(row)
+      return True
+    except queue.Full:
+      logger.warning("Audit queue full, spilling entry to disk")
+      self._spill([row])
+      return False
+
+  def _drain(self, first_row=None):
+    batch = [first_row] if first_row is not None else []
+    while len(batch) < self.batch_size:
+      try:
+        batch.append(self._queue.get_nowait())
+      except queue.Empty:
+        break
+    return batch
+
+  def _run(self):
+    while not self._stop.is_set():
+      try:
+        row = self._queue.get(timeout=self.flush_interval)
+      except queue.Empty:
+        self._replay_spill()
+        continue
+      self._write(self._drain(row))
+
+  def _write(self, batch) -> bool:
+    if not batch:
+      return True
+    try:
+      self.service.log_actions(batch)
+    except Exception as e:
+      logger.error(f"Audit batch insert of {len(batch)} rows failed, spilling to disk: {str(e)}")
+      self._spill(batch)
+      return False
+    self._replay_spill()
+    return True
+
+  def _spill(self, rows):
+    try:
+      os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+      with self._spill_lock, _file_lock(f"{self.spill_path}.lock"):
+        with open(self.spill_path, 'a', encoding='utf-8') as spill_file:
+          spill_file.write(''.join(json.dumps(row) + '\n' for row in rows))
+    except Exception as e:
+      logger.error(f"Failed to spill {len(rows)} audit rows: {str(e)}")
+
+  def _replay_spill(self):
+    """Re-insert spilled rows once the database is reachable again."""
+    if not self._replay_lock.acquire(blocking=False):
+      return
+    try:
+      with _file_lock(f"{self.spill_path}.replay.lock", blocking=False) as acquired:
+        if acquired:
+          self._replay_spill_locked()
+    except Exception as e:
+      logger.error(f"Failed to replay audit spill file: {str(e)}")
+    finally:
+      self._replay_lock.release()
+
+  def _replay_spill_locked(self):
+    """Claim the spill file and insert its rows; the caller holds the replay locks."""
+    replay_path = f"{self.spill_path}.replay"
+    with self._spill_lock, _file_lock(f"{self.spill_path}.lock"):
+      # A leftover .replay file from an interrupted run is retried first
+      if not os.path.exists(replay_path):
+        if not os.path.exists(self.spill_path):
+          return
+        os.replace(self.spill_path, replay_path)
+
+    with open(replay_path, encoding='utf-8') as replay_file:
+      rows = [json.loads(line) for line in replay_file if line.strip()]
+
+    for start in range(0, len(rows), self.batch_size):
+      try:
+        self.service.log_actions(rows[start:start + self.batch_size])
+      except Exception as e:
+        logger.warning(f"Audit spill replay failed, keeping {len(rows) - start} rows: {str(e)}")
+        self._spill(rows[start:])
+        break
+    os.remove(replay_path)
+
+  def flush(self):
+    """Write everything currently queued, synchronously."""
+    while True:
+      batch = self._drain()
+      if not batch:
+        break
+      self._write(batch)
+
+  def shutdown(self):
+    """Stop the worker and flush pending rows (registered with atexit)."""
+    self._stop.set()
+    if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+      self._worker.join(timeout=self.flush_interval + 1)
+    self.flush()
+
+# Singleton instance
+audit_writer = AuditWriter()
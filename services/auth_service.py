@@ -1,13 +1,27 @@
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.security import check_password_hash
 from models import Psychologist, GuidanceCounselor, Client, Admin
-from config import init_supabase
+from config import init_supabase, init_supabase_auth
 
 from flask import render_template, request, session, g, flash, redirect, url_for
 from flask_login import login_user , current_user
 
-from services.accounts_reposervice import account_repo_service
+from services.accounts_reposervice import account_repo_service, MAX_FAILED_LOGIN_ATTEMPTS
 from models.user import User
+from utils.metrics import latency_metrics
+
+# Run the Supabase Auth call alongside the user_accounts lookup during login.
+# Safe because every sign-in uses its thread's own stateless auth client, but
+# off by default: overlapping means unregistered emails also reach Supabase
+# Auth, whose rate limit is counted per server IP.
+LOGIN_CONCURRENT_AUTH = os.getenv('LOGIN_CONCURRENT_AUTH', 'false').lower() == 'true'
+LOGIN_AUTH_WORKERS = int(os.getenv('LOGIN_AUTH_WORKERS', 8))
+
+_login_executor = (ThreadPoolExecutor(max_workers=LOGIN_AUTH_WORKERS, thread_name_prefix='login-auth')
+                   if LOGIN_CONCURRENT_AUTH else None)
 
 class AuthService:
   def __init__(self):
@@ -18,14 +32,21 @@ class AuthService:
       print(f"[Supabase] ❌ Failed to initialize in DatabaseService: {str(e)}")
       self.supabase = None
       self.supabase_role = None
+    # Sign-ins run on private per-thread clients, never the shared anon client
+    self._auth_clients = threading.local()
+
+  def _auth_client(self):
+    client = getattr(self._auth_clients, 'client', None)
+    if client is None:
+      client = self._auth_clients.client = init_supabase_auth()
+    return client
 
   def authenticate_user(self, credentials: dict):
       try:
           print(f"[AUTH] Authenticating user with email: {credentials.get('email')}")
-          response = self.supabase.auth.sign_in_with_password(credentials)
-          print(f"[AUTH] Supabase response: {response.user}")
+          response = self._auth_client().auth.sign_in_with_password(credentials)
           if response.user:
-            print(f"[AUTH] User authenticated: {response}")
+            print(f"[AUTH] User authenticated: {response.user.id}")
             return response.user  # Authenticated user object
           return None
       except Exception as e:
@@ -34,58 +55,82 @@ class AuthService:
           print(traceback.format_exc())
           return None
 
+  def _timed_authenticate(self, credentials: dict):
+      started = time.perf_counter()
+      user = self.authenticate_user(credentials)
+      return user, time.perf_counter() - started
+
   """Process login for both users and admins."""
   def process_login(self, form, is_admin=False):
-      print(f"[DEBUG] ***app.py_process_login ***")
+      trace = latency_metrics.trace('admin_login' if is_admin else 'login')
+      try:
+          return self._process_login(form, is_admin, trace)
+      except Exception:
+          trace.outcome = 'error'
+          raise
+      finally:
+          trace.finish()
 
+  def _process_login(self, form, is_admin, trace):
       login_url = 'admin/login.html' if is_admin else 'auth/login.html'
       email = form.email.data.lower().strip()
       password = form.password.data
       remember_me = form.remember_me.data
       
       print(f"\n[LOGIN] {'Admin' if is_admin else 'User'} login attempt - Email: {email}")
-      print(f"[DEBUG] Remember me: {remember_me}")
+      credentials = { "email": email, "password": password }
+      # With LOGIN_CONCURRENT_AUTH the auth call overlaps the lookup; its result
+      # is only used once the email is known to be registered
+      auth_future = _login_executor.submit(self._timed_authenticate, credentials) if LOGIN_CONCURRENT_AUTH else None
       
       # Validation : Check if Email is registered or not
-      response_email = account_repo_service.get_account_by_email(email)
+      with trace.span('lookup'):
+          response_email = account_repo_service.get_account_by_email(email)
       user = response_email.data[0] if response_email and response_email.data else None
       if not response_email or not response_email.data or len(response_email.data) == 0:
           flash('Email not registered. Please sign up.', 'danger')
           print("[DEBUG] Login failed - email not found or not registered:", email)
+          trace.outcome = 'not_registered'
           return render_template(login_url, form=form)
 
       user_role = user.get('role')
       # Validation : Check if Credentials are correct
-      credentials = { "email": email, "password": password }
-      response = auth_service.authenticate_user(credentials)
+      if auth_future is not None:
+          response, auth_seconds = auth_future.result()
+      else:
+          response, auth_seconds = self._timed_authenticate(credentials)
+      trace.record('auth', auth_seconds)
       
       if response is None:
-          # Check for too many failed login attempts
-          failed_attempts = user.get('failed_attempt', 0)
-          if failed_attempts >= 5:  # Lock account after 5 failed attempts
-              print(f"[LOGIN] Account locked due to too many failed {failed_attempts} attempts: {email}")
+          # Lets login_limiter count this against the account's failure budget
+          g.login_failed = True
+          # Count the failed attempt and apply the lockout atomically, in one round trip
+          with trace.span('attempt_update'):
+              attempts = account_repo_service.record_failed_login(email, user_role, MAX_FAILED_LOGIN_ATTEMPTS)
+          previous_attempts = attempts['previous_attempts'] if attempts else user.get('failed_attempt', 0)
+          if previous_attempts >= MAX_FAILED_LOGIN_ATTEMPTS:
+              print(f"[LOGIN] Account locked due to too many failed {previous_attempts} attempts: {email}")
+              trace.outcome = 'locked'
               flash('This account is temporarily locked. Please try again later or contact support.', 'error')
               return render_template(login_url, form=form)
           
-          # Update failed login attempts
-          account_repo_service.update_attempts(email, user_role, failed_attempts + 1)
-          remaining_attempts = 5 - (failed_attempts + 1)
+          remaining_attempts = MAX_FAILED_LOGIN_ATTEMPTS - (attempts['failed_attempts'] if attempts else previous_attempts + 1)
           if remaining_attempts > 0:
               flash(f'Invalid password. {remaining_attempts} attempts remaining.', 'error')
           else:
               flash('Account locked due to too many failed attempts. Please contact support.', 'error')
           
           print("[DEBUG] Login failed - authentication service error or invalid credentials")
+          trace.outcome = 'invalid_credentials'
           return render_template(login_url, form=form)
       
-      print("[DEBUG] Login Success - DATA : ", user)
-     
       user_id = response.id
       # Validate: User login is active or not
       is_active = user.get('is_active', True)
       if not is_active:
         print(f"[LOGIN] User account is not active: {email}")
         flash('This user account is disabled. Please contact support.', 'error')
+        trace.outcome = 'inactive'
         return render_template(login_url, form=form)
         
       print(f"[LOGIN] User account found and authenticated {user_role} user: {email}")
@@ -109,17 +154,17 @@ class AuthService:
           )
       
       # Assign user object to flask login user for authenthication purposes in admin route
-      login_user(user_obj, remember=remember_me)
+      with trace.span('session'):
+        login_user(user_obj, remember=remember_me)
       
       print(f"[DEBUG] user_role: {user_role}, is_admin: {current_user.is_admin}")
-      print(f"[DEBUG] Redirecting to: {url_for('admin.dashboard') if user_role != 'client' else url_for('dashboard')}")
-      print(f"[DEBUG] current_user: {current_user}, id: {current_user.id}, is_admin: {current_user.is_admin}")
-      
       
       flash(f'Welcome back, {full_name}!', 'success')
       
       # Reset failed attempts and Update
-      account_repo_service.reset_attempts(email, user_role)    
+      with trace.span('attempt_update'):
+        account_repo_service.reset_attempts(email, user_role)
+      trace.outcome = 'success'
       
       if user_role != 'client':
         # For Admin dashboard users
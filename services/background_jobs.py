@@ -0,0 +1,126 @@
+import os
+import heapq
+import atexit
+import logging
+import itertools
+import threading
+import time
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BACKGROUND_JOB_MAX_ATTEMPTS = int(os.getenv('BACKGROUND_JOB_MAX_ATTEMPTS', 6))
+# Retry n waits BACKGROUND_JOB_BACKOFF * 2**(n-1) seconds, capped at BACKGROUND_JOB_BACKOFF_MAX
+BACKGROUND_JOB_BACKOFF = float(os.getenv('BACKGROUND_JOB_BACKOFF', 1.0))
+BACKGROUND_JOB_BACKOFF_MAX = float(os.getenv('BACKGROUND_JOB_BACKOFF_MAX', 60.0))
+BACKGROUND_JOB_WORKERS = int(os.getenv('BACKGROUND_JOB_WORKERS', 2))
+
+class RetryJob(Exception):
+  """Raised by a job that should be tried again later (e.g. a dependency isn't ready yet)."""
+
+class BackgroundJobQueue:
+  """In-process queue of delayed jobs with retry and exponential backoff.
+
+  submit() returns immediately; daemon workers run each job once it is due.
+  A job that raises is retried with backoff until max_attempts, then logged
+  and dropped, so request threads never sleep waiting on slow side effects.
+  Workers are started lazily, and again in each forked worker process.
+  """
+
+  def __init__(self, name: str = 'background-jobs', workers: int = BACKGROUND_JOB_WORKERS,
+               max_attempts: int = BACKGROUND_JOB_MAX_ATTEMPTS, backoff: float = BACKGROUND_JOB_BACKOFF,
+               backoff_max: float = BACKGROUND_JOB_BACKOFF_MAX):
+    self.name = name
+    self.workers = max(1, workers)
+    self.max_attempts = max(1, max_attempts)
+    self.backoff = backoff
+    self.backoff_max = backoff_max
+    self._jobs = []
+    self._sequence = itertools.count()
+    self._condition = threading.Condition()
+    self._threads = []
+    self._threads_pid = None
+    self._stop = False
+    atexit.register(self.shutdown)
+
+  def _ensure_workers(self):
+    if self._threads_pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+      return
+    with self._condition:
+      if self._threads_pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+        return
+      self._stop = False
+      self._threads = [thread for thread in self._threads if thread.is_alive()] if self._threads_pid == os.getpid() else []
+      while len(self._threads) < self.workers:
+        thread = threading.Thread(target=self._run, name=f"{self.name}-{len(self._threads)}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+      self._threads_pid = os.getpid()
+
+  def submit(self, func, *args, delay: float = 0, description: str = None, **kwargs):
+    """Schedule func(*args, **kwargs) to run in the background after delay seconds."""
+    job = {
+      'func': func,
+      'args': args,
+      'kwargs': kwargs,
+      'attempt': 1,
+      'description': description or getattr(func, '__name__', 'job')
+    }
+    self._ensure_workers()
+    self._push(job, delay)
+    return job
+
+  def _push(self, job, delay):
+    with self._condition:
+      heapq.heappush(self._jobs, (time.monotonic() + max(delay, 0), next(self._sequence), job))
+      self._condition.notify()
+
+  def pending(self) -> int:
+    with self._condition:
+      return len(self._jobs)
+
+  def _next_due(self):
+    with self._condition:
+      while not self._stop:
+        if self._jobs:
+          wait = self._jobs[0][0] - time.monotonic()
+          if wait <= 0:
+            return heapq.heappop(self._jobs)[2]
+          self._condition.wait(wait)
+        else:
+          self._condition.wait()
+      return None
+
+  def _run(self):
+    while True:
+      job = self._next_due()
+      if job is None:
+        return
+      self._execute(job)
+
+  def _execute(self, job):
+    try:
+      job['func'](*job['args'], **job['kwargs'])
+      if job['attempt'] > 1:
+        logger.info(f"{job['description']} succeeded on attempt {job['attempt']}")
+    except Exception as e:
+      if job['attempt'] >= self.max_attempts:
+        logger.error(f"{job['description']} failed after {job['attempt']} attempts, giving up: {str(e)}")
+        return
+      delay = min(self.backoff * (2 ** (job['attempt'] - 1)), self.backoff_max)
+      level = logging.INFO if isinstance(e, RetryJob) else logging.WARNING
+      logger.log(level, f"{job['description']} attempt {job['attempt']} failed, retrying in {delay:.1f}s: {str(e)}")
+      job['attempt'] += 1
+      self._push(job, delay)
+
+  def shutdown(self):
+    """Stop the workers (registered with atexit); jobs still waiting are logged and dropped."""
+    with self._condition:
+      self._stop = True
+      self._condition.notify_all()
+      pending = len(self._jobs)
+    if pending:
+      logger.warning(f"{self.name}: {pending} background jobs were not run before shutdown")
+
+# Singleton instance
+background_jobs = BackgroundJobQueue()
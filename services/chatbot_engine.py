@@ -0,0 +1,53 @@
+import os
+import time
+import threading
+from collections import deque
+from chatbot_rules import get_bot_response
+from services.chatbot_session_service import chatbot_session_service, ChatbotSessionService
+
+# Per-connection message budget for the Socket.IO transport
+CHATBOT_SOCKET_RATE_LIMIT = int(os.getenv('CHATBOT_SOCKET_RATE_LIMIT', 10))
+CHATBOT_SOCKET_RATE_WINDOW = float(os.getenv('CHATBOT_SOCKET_RATE_WINDOW', 60))
+
+class ChatbotEngine:
+  """The one chatbot entry point shared by the HTTP route and Socket.IO.
+
+  respond() loads the conversation state, runs the rules and saves the state
+  back. allow() is a sliding-window rate limit per Socket.IO connection; the
+  HTTP route is limited by flask-limiter instead.
+  """
+
+  def __init__(self, sessions: ChatbotSessionService = chatbot_session_service,
+               rate_limit: int = CHATBOT_SOCKET_RATE_LIMIT, rate_window: float = CHATBOT_SOCKET_RATE_WINDOW):
+    self.sessions = sessions
+    self.rate_limit = rate_limit
+    self.rate_window = rate_window
+    self._windows = {}
+    self._windows_lock = threading.Lock()
+
+  def respond(self, key: str, message: str, user_id=None) -> dict:
+    state = self.sessions.load(key, user_id)
+    reply, topic, user_facts = get_bot_response(message, state['last_topic'], state['user_facts'])
+    # Unmatched messages keep the previous topic so follow-ups still work
+    topic = topic or state['last_topic']
+    self.sessions.save(key, topic, user_facts)
+    return {'reply': reply, 'topic': topic}
+
+  def allow(self, connection_id: str) -> bool:
+    """Record a message for connection_id; False once it exceeds its budget."""
+    now = time.monotonic()
+    with self._windows_lock:
+      window = self._windows.setdefault(connection_id, deque())
+      while window and window[0] <= now - self.rate_window:
+        window.popleft()
+      if len(window) >= self.rate_limit:
+        return False
+      window.append(now)
+      return True
+
+  def disconnect(self, connection_id: str):
+    with self._windows_lock:
+      self._windows.pop(connection_id, None)
+
+# Singleton instance
+chatbot_engine = ChatbotEngine()
@@ -0,0 +1,103 @@
+import os
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from config import init_supabase
+from utils.cache import TTLCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Idle conversations are evicted after this many seconds
+CHATBOT_SESSION_TTL = float(os.getenv('CHATBOT_SESSION_TTL', 1800))
+CHATBOT_SESSION_MAX = int(os.getenv('CHATBOT_SESSION_MAX', 10000))
+CHATBOT_MEMORY_TABLE = 'chatbot_memory'
+
+class ChatbotSessionService:
+  """Server-side chatbot conversation state (last topic and user facts).
+
+  State lives in a TTL+LRU cache keyed by conversation, so the browser only
+  sends the new message. For logged-in users the facts carry their user_id
+  (the persist_facts hook in chatbot_rules) and are written through to the
+  chatbot_memory table whenever they change, then read back on a cache miss.
+  """
+
+  def __init__(self):
+    self._cache = TTLCache(maxsize=CHATBOT_SESSION_MAX, ttl=CHATBOT_SESSION_TTL)
+    self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chatbot-memory')
+    try:
+      self.supabase = init_supabase(service_role=True)
+      print("[Supabase] Connection initialized in ChatbotSessionService")
+    except Exception as e:
+      print(f"[Supabase] ❌ Failed to initialize in ChatbotSessionService: {str(e)}")
+      self.supabase = None
+
+  @staticmethod
+  def session_key(conversation_id: str, user_id=None) -> str:
+    return f"user:{user_id}" if user_id is not None else f"anon:{conversation_id}"
+
+  def load(self, key: str, user_id=None) -> dict:
+    """Return a private copy of the conversation state for key."""
+    state = self._cache.get(key)
+    if state is None:
+      state = self._load_persisted(user_id) if user_id is not None else None
+      if state is None:
+        state = {'last_topic': None, 'user_facts': {}}
+      if user_id is not None:
+        state['user_facts']['user_id'] = str(user_id)
+      self._cache.set(key, state)
+    return copy.deepcopy(state)
+
+  def save(self, key: str, last_topic, user_facts: dict):
+    """Store the updated state; persist facts for logged-in users if they changed."""
+    previous = self._cache.get(key)
+    self._cache.set(key, {'last_topic': last_topic, 'user_facts': user_facts})
+    if user_facts.get('user_id') is None:
+      return
+    if previous is not None and previous['user_facts'] == user_facts and previous['last_topic'] == last_topic:
+      return
+    self._executor.submit(self._persist, user_facts['user_id'], last_topic, copy.deepcopy(user_facts))
+
+  def clear(self, key: str, user_id=None):
+    self._cache.invalidate(key)
+    if user_id is not None and self.supabase:
+      self._executor.submit(self._delete_persisted, user_id)
+
+  def _load_persisted(self, user_id):
+    if not self.supabase:
+      return None
+    try:
+      result = (self.supabase.table(CHATBOT_MEMORY_TABLE)
+                    .select('last_topic, facts')
+                    .eq('user_id', str(user_id))
+                    .limit(1)
+                    .execute())
+      if result.data:
+        row = result.data[0]
+        return {'last_topic': row.get('last_topic'), 'user_facts': row.get('facts') or {}}
+    except Exception as e:
+      logger.warning(f"Could not load chatbot memory for user {user_id}: {str(e)}")
+    return None
+
+  def _persist(self, user_id, last_topic, user_facts):
+    if not self.supabase:
+      return
+    try:
+      self.supabase.table(CHATBOT_MEMORY_TABLE).upsert({
+        'user_id': str(user_id),
+        'last_topic': last_topic,
+        'facts': user_facts,
+        'updated_at': datetime.now(timezone.utc).isoformat()
+      }, on_conflict='user_id').execute()
+    except Exception as e:
+      logger.error(f"Failed to persist chatbot memory for user {user_id}: {str(e)}")
+
+  def _delete_persisted(self, user_id):
+    try:
+      self.supabase.table(CHATBOT_MEMORY_TABLE).delete().eq('user_id', str(user_id)).execute()
+    except Exception as e:
+      logger.error(f"Failed to delete chatbot memory for user {user_id}: {str(e)}")
+
+# Singleton instance
+chatbot_session_service = ChatbotSessionService()
@@ -1,14 +1,27 @@
 import os
 import logging
+from collections import Counter
 from datetime import datetime
 from config import init_supabase
+from utils.cache import TTLCache
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Ids per in_() filter; keeps the PostgREST request URL well under proxy limits
+CONTENT_BULK_CHUNK_SIZE = int(os.getenv('CONTENT_BULK_CHUNK_SIZE', 100))
+# How long computed content counters are reused; writes through this service clear them
+CONTENT_STATS_TTL = float(os.getenv('CONTENT_STATS_TTL', 30))
+CONTENT_STATS_BREAKDOWNS = ('category', 'content_type', 'target_audience')
+CONTENT_SEARCH_PAGE_SIZE = 50
+CONTENT_SEARCH_MAX_PAGE_SIZE = 200
+# Columns the content management grid renders (static/js/content_management.js)
+CONTENT_LIST_COLUMNS = ('id', 'content_type', 'author', 'messages', 'is_active', 'created_by', 'created_at', 'updated_at')
+
 class ContentRepoService:
   def __init__(self):
-    
+    self.stats_cache = TTLCache(maxsize=1, ttl=CONTENT_STATS_TTL)
+    self._invalidation_listeners = []
     try:
       # Use service role for admin operations like delete
       self.supabase = init_supabase(service_role=True)
@@ -28,6 +41,7 @@ class ContentRepoService:
                     .insert(content_data)
                     .execute())
       logger.info(f"Content created successfully: {result}")
+      self.invalidate_content_caches()
       return result
     except Exception as e:
       logger.error(f"Error creating content: {str(e)}")
@@ -44,6 +58,7 @@ class ContentRepoService:
                     .eq('id', content_id)
                     .execute())
       logger.info(f"Content updated successfully: {content_id}")
+      self.invalidate_content_caches()
       return result
     except Exception as e:
       logger.error(f"Error updating content {content_id}: {str(e)}")
@@ -77,21 +92,11 @@ class ContentRepoService:
       
       logger.info(f"Content found for deletion: {content_id}")
       
-      # For delete operations, ensure we're using service role if needed
-      try:
-        # Use service role client for delete to bypass RLS
-        service_client = init_supabase(service_role=True)
-        result = (service_client.table('content_management')
-                      .delete()
-                      .eq('id', content_id)
-                      .execute())
-      except Exception as service_error:
-        logger.warning(f"Service role delete failed, trying with regular client: {service_error}")
-        # Fallback to regular client
-        result = (self.supabase.table('content_management')
-                      .delete()
-                      .eq('id', content_id)
-                      .execute())
+      # self.supabase is the shared service role client, which bypasses RLS
+      result = (self.supabase.table('content_management')
+                    .delete()
+                    .eq('id', content_id)
+                    .execute())
       
       # Log the full result for debugging
       logger.info(f"Delete operation result: {result}")
@@ -110,6 +115,7 @@ class ContentRepoService:
       else:
         logger.info(f"Content successfully deleted and verified: {content_id}")
       
+      self.invalidate_content_caches()
       return result
     except Exception as e:
       logger.error(f"Error deleting content {content_id}: {str(e)}")
@@ -126,6 +132,7 @@ class ContentRepoService:
                     .eq('id', content_id)
                     .execute())
       logger.info(f"Content set to inactive: {content_id}")
+      self.invalidate_content_caches()
       return result
     except Exception as e:
       logger.error(f"Error setting content inactive {content_id}: {str(e)}")
@@ -142,11 +149,62 @@ class ContentRepoService:
                     .eq('id', content_id)
                     .execute())
       logger.info(f"Content activated: {content_id}")
+      self.invalidate_content_caches()
       return result
     except Exception as e:
       logger.error(f"Error activating content {content_id}: {str(e)}")
       raise e
     
+  @staticmethod
+  def _chunks(ids, size=CONTENT_BULK_CHUNK_SIZE):
+    # dict.fromkeys drops duplicates but keeps the caller's order
+    unique_ids = list(dict.fromkeys(str(content_id) for content_id in ids))
+    for start in range(0, len(unique_ids), size):
+      yield unique_ids[start:start + size]
+
+  def _bulk_apply(self, content_ids, build_query, action: str) -> dict:
+    """Run build_query(chunk) once per chunk of ids and sort the ids by outcome.
+
+    An id counts as succeeded when its row comes back in the returning payload;
+    ids that matched no row are reported as not_found, and every id of a chunk
+    whose request raised is reported as failed.
+    """
+    outcome = {'succeeded': [], 'not_found': [], 'failed': []}
+    for chunk in self._chunks(content_ids):
+      try:
+        result = build_query(chunk).execute()
+      except Exception as e:
+        logger.error(f"Bulk {action} failed for {len(chunk)} content ids: {str(e)}")
+        outcome['failed'].extend(chunk)
+        continue
+      returned = {str(row.get('id')) for row in (result.data or [])}
+      for content_id in chunk:
+        outcome['succeeded' if content_id in returned else 'not_found'].append(content_id)
+    logger.info(f"Bulk {action}: {len(outcome['succeeded'])} succeeded, "
+                f"{len(outcome['not_found'])} not found, {len(outcome['failed'])} failed")
+    if outcome['succeeded']:
+      self.invalidate_content_caches()
+    return outcome
+
+  def set_contents_active(self, content_ids, is_active: bool) -> dict:
+    """Activate or deactivate many content records with one update per chunk."""
+    def build_query(chunk):
+      return (self.supabase.table('content_management')
+                  .update({
+                      "is_active": is_active,
+                      "updated_at": datetime.utcnow().isoformat()
+                  })
+                  .in_('id', chunk))
+    return self._bulk_apply(content_ids, build_query, 'activate' if is_active else 'deactivate')
+
+  def delete_contents(self, content_ids) -> dict:
+    """Permanently delete many content records with one delete per chunk."""
+    def build_query(chunk):
+      return (self.supabase.table('content_management')
+                  .delete()
+                  .in_('id', chunk))
+    return self._bulk_apply(content_ids, build_query, 'delete')
+
   def get_all_contents(self, filters=None):
     """Get all content records with optional filtering."""
     try:
@@ -180,65 +238,154 @@ class ContentRepoService:
       logger.error(f"Error retrieving contents: {str(e)}")
       raise e
 
-  def search_contents(self, search_query: str, filters=None):
-    """Search content by author or messages."""
+  def list_contents_page(self, filters=None, limit: int = 25, offset: int = 0) -> dict:
+    """Return one page of content rows (grid columns only) plus the filtered total."""
+    filters = filters or {}
+    limit = max(1, min(int(limit), CONTENT_SEARCH_MAX_PAGE_SIZE))
+    offset = max(0, int(offset))
     try:
-      query = self.supabase.table('content_management').select('*')
-      
-      # Apply search to author and messages
-      if search_query:
-        query = query.or_(f'author.ilike.%{search_query}%,messages.ilike.%{search_query}%')
-      
-      # Apply additional filters
-      if filters:
-        if filters.get('is_active') is not None:
-          query = query.eq('is_active', filters['is_active'])
-        if filters.get('category'):
-          query = query.eq('category', filters['category'])
-        if filters.get('content_type'):
-          query = query.eq('content_type', filters['content_type'])
-      
-      result = query.order('created_at', desc=True).execute()
+      query = (self.supabase.table('content_management')
+                  .select(', '.join(CONTENT_LIST_COLUMNS), count='exact'))
+      if filters.get('is_active') is not None:
+        query = query.eq('is_active', filters['is_active'])
+      if filters.get('category'):
+        query = query.eq('category', filters['category'])
+      if filters.get('content_type'):
+        query = query.eq('content_type', filters['content_type'])
+
+      result = (query.order('created_at', desc=True)
+                     .order('id', desc=True)
+                     .range(offset, offset + limit - 1)
+                     .execute())
+      rows = result.data or []
+      total = result.count if result.count is not None else offset + len(rows)
+      return {'rows': rows, 'total': total}
+    except Exception as e:
+      logger.error(f"Error retrieving content page: {str(e)}")
+      raise e
+
+  def search_contents(self, search_query: str, filters=None, limit: int = CONTENT_SEARCH_PAGE_SIZE, offset: int = 0):
+    """Search content by author or messages.
+
+    Uses the search_content() RPC: an indexed full-text search ranked by
+    relevance where every word matches as a prefix, paginated by
+    limit/offset. Falls back to the old ilike scan if the migration hasn't
+    been applied.
+    """
+    filters = filters or {}
+    limit = max(1, min(int(limit), CONTENT_SEARCH_MAX_PAGE_SIZE))
+    offset = max(0, int(offset))
+    try:
+      try:
+        result = self.supabase.rpc('search_content', {
+          'search_query': search_query,
+          'filter_is_active': filters.get('is_active'),
+          'filter_category': filters.get('category') or None,
+          'filter_content_type': filters.get('content_type') or None,
+          'result_limit': limit,
+          'result_offset': offset
+        }).execute()
+      except Exception as e:
+        logger.warning(f"search_content RPC unavailable, falling back to ilike scan: {str(e)}")
+        result = self._ilike_search(search_query, filters, limit, offset)
       logger.info(f"Search returned {len(result.data) if result.data else 0} results")
       return result
     except Exception as e:
       logger.error(f"Error searching contents: {str(e)}")
       raise e
 
-  def get_random_content(self):
-    """Get a random content from the content_management table."""
+  def _ilike_search(self, search_query: str, filters: dict, limit: int, offset: int):
+    query = self.supabase.table('content_management').select('*')
+    
+    # Apply search to author and messages
+    if search_query:
+      query = query.or_(f'author.ilike.%{search_query}%,messages.ilike.%{search_query}%')
+    
+    # Apply additional filters
+    if filters.get('is_active') is not None:
+      query = query.eq('is_active', filters['is_active'])
+    if filters.get('category'):
+      query = query.eq('category', filters['category'])
+    if filters.get('content_type'):
+      query = query.eq('content_type', filters['content_type'])
+    
+    return query.order('created_at', desc=True).range(offset, offset + limit - 1).execute()
+
+  def get_random_content(self, user_id=None):
+    """Get a random active content record.
+
+    Picks from RandomContentService's in-memory id snapshot instead of
+    sorting the table with random(); returns the same response shape as
+    get_content_by_id.
+    """
+    from services.random_content_service import random_content_service
     try:
-      result = (self.supabase.table('content_management')
-                    .select('*')
-                    .eq('is_active', True)
-                    .order('random()')
-                    .limit(1)
-                    .execute())
+      content_id = random_content_service.pick_id(user_id)
+      if content_id is None:
+        logger.info("No active content available for random selection")
+        return None
+      result = self.get_content_by_id(content_id)
       logger.info("Random content retrieved")
       return result
     except Exception as e:
       logger.error(f"Error retrieving random content: {str(e)}")
       raise e
       
-  def get_content_stats(self):
-    """Get content statistics."""
+  def get_content_stats(self, force_refresh: bool = False):
+    """Get content statistics: total/active/inactive plus per-category,
+    content_type and target_audience counts.
+
+    Computed by the content_stats() RPC in one round trip (or, where that
+    function isn't installed, from a single narrow select) and cached for
+    CONTENT_STATS_TTL seconds.
+    """
+    if not force_refresh:
+      cached = self.stats_cache.get('stats')
+      if cached is not None:
+        return cached
+
     try:
-      # Get total counts
-      total_result = self.supabase.table('content_management').select('id', count='exact').execute()
-      active_result = self.supabase.table('content_management').select('id', count='exact').eq('is_active', True).execute()
-      inactive_result = self.supabase.table('content_management').select('id', count='exact').eq('is_active', False).execute()
-      
-      stats = {
-        'total': total_result.count if total_result else 0,
-        'active': active_result.count if active_result else 0,
-        'inactive': inactive_result.count if inactive_result else 0
-      }
-      
-      logger.info(f"Content stats retrieved: {stats}")
+      try:
+        stats = self.supabase.rpc('content_stats').execute().data
+      except Exception as e:
+        logger.warning(f"content_stats RPC unavailable, aggregating locally: {str(e)}")
+        stats = self._aggregate_content_stats()
+
+      logger.info(f"Content stats retrieved: total={stats.get('total')}")
+      self.stats_cache.set('stats', stats)
       return stats
     except Exception as e:
       logger.error(f"Error retrieving content stats: {str(e)}")
-      return {'total': 0, 'active': 0, 'inactive': 0}
-      
+      empty = {'total': 0, 'active': 0, 'inactive': 0}
+      empty.update({f'by_{column}': {} for column in CONTENT_STATS_BREAKDOWNS})
+      return empty
+
+  def _aggregate_content_stats(self):
+    result = (self.supabase.table('content_management')
+                  .select('is_active, ' + ', '.join(CONTENT_STATS_BREAKDOWNS))
+                  .execute())
+    rows = result.data or []
+    stats = {
+      'total': len(rows),
+      'active': sum(1 for row in rows if row.get('is_active') is True),
+      'inactive': sum(1 for row in rows if row.get('is_active') is False)
+    }
+    for column in CONTENT_STATS_BREAKDOWNS:
+      stats[f'by_{column}'] = dict(Counter(row.get(column) or 'unspecified' for row in rows))
+    return stats
+
+  def add_invalidation_listener(self, listener):
+    """Register a callable run whenever content is written through this service."""
+    self._invalidation_listeners.append(listener)
+
+  def invalidate_content_caches(self):
+    """Drop derived content data after a write."""
+    self.stats_cache.clear()
+    for listener in self._invalidation_listeners:
+      try:
+        listener()
+      except Exception as e:
+        logger.error(f"Content invalidation listener failed: {str(e)}")
+
 #singleton instance
 content_repo_service = ContentRepoService()
\ No newline at end of file
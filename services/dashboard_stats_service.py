@@ -0,0 +1,103 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from config import init_supabase
+from utils.cache import TTLCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# How long computed dashboard counters are reused before re-querying
+DASHBOARD_STATS_TTL = float(os.getenv('DASHBOARD_STATS_TTL', 60))
+
+# Columns the dashboard's recent activity list needs from `clients`
+RECENT_ACTIVITY_COLUMNS = 'id, first_name, last_name, email, username, last_login, created_at'
+
+class DashboardStatsService:
+  """Admin dashboard counters computed server-side with head-only count queries."""
+
+  def __init__(self):
+    self._cache = TTLCache(maxsize=4, ttl=DASHBOARD_STATS_TTL)
+    self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='dashboard-stats')
+    try:
+      self.supabase = init_supabase()
+      print("[Supabase] Connection initialized in DashboardStatsService")
+    except Exception as e:
+      print(f"[Supabase] ❌ Failed to initialize in DashboardStatsService: {str(e)}")
+      self.supabase = None
+
+  def _count(self, build_query):
+    """Run a head-only exact count; PostgREST returns no rows, only the count."""
+    query = self.supabase.table('clients').select('id', count='exact', head=True)
+    result = build_query(query).execute()
+    return result.count or 0
+
+  def _total_users(self):
+    return self._count(lambda query: query)
+
+  def _new_users(self, since: str):
+    return self._count(lambda query: query.gte('created_at', since))
+
+  def _active_users(self, since: str):
+    return self._count(lambda query: query.not_.is_('last_login', 'null').gte('last_login', since))
+
+  def _recent_activity(self, limit: int = 10):
+    result = (self.supabase.table('clients')
+                  .select(RECENT_ACTIVITY_COLUMNS)
+                  .not_.is_('last_login', 'null')
+                  .order('last_login', desc=True)
+                  .limit(limit)
+                  .execute())
+    return result.data or []
+
+  def get_dashboard_stats(self, force_refresh: bool = False) -> dict:
+    """Return total/new/active user counters and recent logins.
+
+    All four queries are issued concurrently and the combined result is
+    cached for DASHBOARD_STATS_TTL seconds.
+    """
+    if not force_refresh:
+      cached = self._cache.get('stats')
+      if cached is not None:
+        return cached
+
+    stats = {
+      'total_users': 0,
+      'new_users': 0,
+      'total_active_users': 0,
+      'recent_activity': []
+    }
+    if not self.supabase:
+      logger.error("Supabase client not initialized, returning empty dashboard stats")
+      return stats
+
+    now = datetime.now(timezone.utc)
+    one_week_ago = (now - timedelta(days=7)).date().isoformat()
+    one_day_ago = (now - timedelta(days=1)).isoformat()
+
+    futures = {
+      'total_users': self._executor.submit(self._total_users),
+      'new_users': self._executor.submit(self._new_users, one_week_ago),
+      'total_active_users': self._executor.submit(self._active_users, one_day_ago),
+      'recent_activity': self._executor.submit(self._recent_activity)
+    }
+
+    failed = False
+    for name, future in futures.items():
+      try:
+        stats[name] = future.result()
+      except Exception as e:
+        failed = True
+        logger.warning(f"Could not compute dashboard stat {name}: {str(e)}")
+
+    # Don't pin partial results in the cache
+    if not failed:
+      self._cache.set('stats', stats)
+    return stats
+
+  def invalidate(self):
+    self._cache.clear()
+
+# Singleton instance
+dashboard_stats_service = DashboardStatsService()
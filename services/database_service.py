@@ -1,9 +1,9 @@
-import os
 from typing import List, Optional, Dict, Any, Union
-from datetime import datetime, timedelta, timezone, date
-from supabase import create_client, Client
+from datetime import datetime, timezone, date
+from supabase import Client
 from config import init_supabase
 from models.user import User
+from services.schema_service import schema_service
 from models.game_score import GameScore
 from models.personality_test import PersonalityTestResult
 from models.admin import Admin
@@ -30,21 +30,14 @@ class DatabaseService:
         Raises:
             Exception: If Supabase client is not initialized
         """
-        if not self.supabase:
-            try:
-                if use_service_role:
-                    # Import here to avoid circular imports
-                    from config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
-                    self.supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-                else:
-                    self.supabase = init_supabase()
-                    
-                if not self.supabase:
-                    raise Exception("Failed to initialize Supabase client")
-            except Exception as e:
-                print(f"[Supabase] ❌ Error getting Supabase client: {str(e)}")
-                raise Exception("Database connection error. Please try again later.")
-        return self.supabase
+        try:
+            client = init_supabase(service_role=use_service_role)
+            if not client:
+                raise Exception("Failed to initialize Supabase client")
+            return client
+        except Exception as e:
+            print(f"[Supabase] ❌ Error getting Supabase client: {str(e)}")
+            raise Exception("Database connection error. Please try again later.")
     
     # User Management Methods
     def get_users_count(self) -> int:
@@ -69,8 +62,6 @@ class DatabaseService:
                     if not user:
                         continue
                 
-                print(f"[DEBUG] Processing user: {user.get('email', 'unknown')}")
-                
                 # Map client fields to the expected user format
                 user_data = {
                     'id': str(user.get('id', '')),
@@ -101,7 +92,6 @@ class DatabaseService:
                         user_data[key] = ''
                 
                 processed_users.append(user_data)
-                print(f"[DEBUG] Successfully processed user: {user_data['email']}")
                 
             except Exception as e:
                 print(f"[ERROR] Error processing user: {str(e)}")
@@ -134,8 +124,6 @@ class DatabaseService:
                 
                 if result.data:
                     print(f"[DEBUG] Found {len(result.data)} users in 'clients' table")
-                    if len(result.data) > 0:
-                        print(f"[DEBUG] Sample client data: {result.data[0]}")
                     
                     # Process the client users
                     users = self._process_client_users(result.data)
@@ -145,7 +133,6 @@ class DatabaseService:
                 
                 print(f"\n[DEBUG] ====== get_all_users completed ======")
                 print(f"[DEBUG] Total users processed: {len(users)}")
-                print(f"[DEBUG] First user email: {users[0].get('email') if users else 'No users'}")
                 return users
                 
             except Exception as e:
@@ -428,72 +415,7 @@ class DatabaseService:
         if not use_service_role:
             return self.supabase
             
-        service_role_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-        if not service_role_key:
-            raise ValueError("SUPABASE_SERVICE_ROLE_KEY not found in environment variables")
-            
-        return create_client(os.getenv('SUPABASE_URL'), service_role_key)
-    
-    def increment_failed_login_attempts(self, user_id: str, max_attempts: int = 5, lockout_minutes: int = 15) -> Optional[User]:
-        """
-        Increment the failed login attempts counter and lock the account if needed.
-        
-        Args:
-            user_id: The ID of the user
-            max_attempts: Maximum number of allowed failed attempts before lockout
-            lockout_minutes: Number of minutes to lock the account for
-            
-        Returns:
-            Updated User object or None if update failed
-        """
-        if not self.supabase:
-            print("[Supabase] Not connected. Cannot update login attempts.")
-            return None
-            
-        # Use service role client for updates that may bypass RLS
-        client = self._get_client(use_service_role=True)
-        try:
-            # Get current user data
-            user = self.get_user_by_id(user_id, use_service_role=True)
-            if not user:
-                print(f"[ERROR] User {user_id} not found when updating login attempts")
-                return None
-            
-            # Increment failed attempts (if column exists)
-            current_attempts = getattr(user, 'failed_login_attempts', 0) + 1
-            update_data = {
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            
-            # Only add failed_login_attempts if the column exists
-            try:
-                # Test if the column exists by doing a small update
-                test_update = client.table('clients').update({'updated_at': datetime.utcnow().isoformat()}).eq('id', user_id).execute()
-                if test_update:
-                    update_data['failed_login_attempts'] = current_attempts
-            except Exception:
-                # Column doesn't exist, skip it
-                pass
-            
-            # Lock account if max attempts reached
-            if current_attempts >= max_attempts:
-                lockout_until = datetime.utcnow() + timedelta(minutes=lockout_minutes)
-                update_data['account_locked_until'] = lockout_until.isoformat()
-                print(f"[SECURITY] Account {user_id} locked until {lockout_until} after {current_attempts} failed attempts")
-            
-            # Update the user record
-            updated_user = self.update_user(user_id, update_data, use_service_role=True)
-            if not updated_user:
-                print(f"[ERROR] Failed to update login attempts for user {user_id}")
-                return None
-                
-            return updated_user
-            
-        except Exception as e:
-            print(f"[ERROR] Error updating login attempts: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
+        return init_supabase(service_role=True)
     
     def reset_failed_login_attempts(self, user_id: str) -> None:
         """Reset the failed login attempts counter for a user."""
@@ -502,20 +424,12 @@ class DatabaseService:
             return
             
         try:
-            update_data = {
-                'updated_at': datetime.utcnow().isoformat()
-            }
+            update_data = {}
             
             # Only add columns if they exist
-            try:
-                # Test if failed_login_attempts column exists
-                test_update = self.supabase.table('clients').update({'updated_at': datetime.utcnow().isoformat()}).eq('id', user_id).execute()
-                if test_update:
-                    update_data['failed_login_attempts'] = 0
-                    update_data['account_locked_until'] = None
-            except Exception:
-                # Columns don't exist, skip them
-                pass
+            if schema_service.has_columns('clients', 'failed_login_attempts', 'account_locked_until'):
+                update_data['failed_login_attempts'] = 0
+                update_data['account_locked_until'] = None
             
             self.update_user(user_id, update_data, use_service_role=True)
             
@@ -550,6 +464,9 @@ class DatabaseService:
                 if isinstance(value, str) and value.lower() in ('true', 'false'):
                     update_data[key] = value.lower() == 'true'
             
+            # Only write fields that exist in the cached clients schema
+            update_data = schema_service.filter_payload('clients', update_data)
+            
             print(f"[DEBUG] Updating user {user_id} with data: {update_data}")
             response = client.table('clients').update(update_data).eq('id', user_id).execute()
             
@@ -667,27 +584,6 @@ class DatabaseService:
             # 3. Prepare user profile data
             username = user_data.get('username', '').strip() or email.split('@')[0]
             
-            # Start with only the essential columns that should exist
-            profile_data = {
-                'email': email,
-                'username': username,
-                'password_hash': hashed_password
-            }
-            
-            # Try to add optional columns one by one, testing if they exist
-            optional_columns = {
-                'first_name': user_data.get('first_name', '').strip() or None,
-                'last_name': user_data.get('last_name', '').strip() or None,
-                'gender': user_data.get('gender'),
-                'birthdate': user_data.get('birthdate'),
-                'created_at': user_data.get('created_at', datetime.now(timezone.utc).isoformat())
-            }
-            
-            # Only add columns that have values
-            for col, value in optional_columns.items():
-                if value is not None:
-                    profile_data[col] = value
-            
             # 4. Use Supabase Auth to create the user (this bypasses RLS)
             client = self._get_client(use_service_role=True)
             
@@ -742,8 +638,9 @@ class DatabaseService:
                     'is_admin': False,
                     'created_at': user_data.get('created_at', datetime.now(timezone.utc).isoformat())
                 }
-                # Remove Nones to avoid column issues
-                minimal_row = {k: v for k, v in minimal_row.items() if v is not None}
+                # Drop empty values and anything the cached clients schema doesn't have
+                minimal_row = schema_service.filter_payload(
+                    'clients', {k: v for k, v in minimal_row.items() if v is not None})
                 # Use upsert to avoid duplicates if row already exists
                 client.table('clients').upsert(minimal_row, on_conflict='id').execute()
                 print(f"[DEBUG] Synced user to public.clients table: {email}")
@@ -0,0 +1,334 @@
+import os
+import json
+import time
+import atexit
+import smtplib
+import sqlite3
+import logging
+import threading
+from email.message import EmailMessage
+from email.utils import make_msgid
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
+MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
+MAIL_USE_SSL = os.getenv('MAIL_USE_SSL', 'false').lower() == 'true'
+MAIL_USERNAME = os.getenv('MAIL_USERNAME')
+MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
+MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', MAIL_USERNAME)
+MAIL_TIMEOUT = float(os.getenv('MAIL_TIMEOUT', 30))
+
+# Outbox persisted in SQLite so queued mail survives restarts
+MAIL_QUEUE_PATH = os.getenv('MAIL_QUEUE_PATH', os.path.join(project_root, 'instance', 'mail_outbox.sqlite3'))
+MAIL_WORKERS = int(os.getenv('MAIL_WORKERS', 2))
+MAIL_MAX_ATTEMPTS = int(os.getenv('MAIL_MAX_ATTEMPTS', 8))
+# Retry n waits MAIL_RETRY_BACKOFF * 2**(n-1) seconds, capped at MAIL_RETRY_BACKOFF_MAX
+MAIL_RETRY_BACKOFF = float(os.getenv('MAIL_RETRY_BACKOFF', 5))
+MAIL_RETRY_BACKOFF_MAX = float(os.getenv('MAIL_RETRY_BACKOFF_MAX', 900))
+# Workers also poll this often for retries and for mail queued by other processes
+MAIL_POLL_INTERVAL = float(os.getenv('MAIL_POLL_INTERVAL', 2))
+# An open SMTP connection is closed after this many idle seconds
+MAIL_CONNECTION_IDLE = float(os.getenv('MAIL_CONNECTION_IDLE', 30))
+# A message claimed by a worker that died is handed out again after this many seconds
+MAIL_CLAIM_TIMEOUT = float(os.getenv('MAIL_CLAIM_TIMEOUT', 300))
+MAIL_TEMPLATE_DIR = os.path.join(project_root, 'templates', 'email')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mail_outbox (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  sender TEXT,
+  recipients TEXT NOT NULL,
+  subject TEXT NOT NULL,
+  text_body TEXT,
+  html_body TEXT,
+  status TEXT NOT NULL DEFAULT 'pending',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at REAL NOT NULL,
+  claimed_by TEXT,
+  claimed_at REAL,
+  last_error TEXT,
+  created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mail_outbox_due ON mail_outbox (status, next_attempt_at);
+"""
+
+class PermanentMailError(Exception):
+  """The relay rejected the message for good; retrying won't help."""
+
+class MailService:
+  """Outbound mail sent from a persistent queue by background workers.
+
+  send() and send_template() only render the message and insert it into a
+  SQLite outbox (WAL mode, shared by every worker process), so request
+  latency doesn't depend on the mail relay. Worker threads claim due
+  messages, deliver them over an SMTP connection each keeps open between
+  messages, and retry failures with exponential backoff. Messages the relay
+  refuses permanently, or that run out of attempts, stay in the outbox with
+  status 'failed' and their last error.
+
+  Templates in templates/email/ are compiled once at startup. To test
+  locally, point MAIL_SERVER/MAIL_PORT at an SMTP sink such as
+  `python -m aiosmtpd -n -l localhost:1025` with MAIL_USE_TLS=false.
+  """
+
+  def __init__(self, queue_path: str = MAIL_QUEUE_PATH, workers: int = MAIL_WORKERS,
+               template_dir: str = MAIL_TEMPLATE_DIR):
+    self.queue_path = queue_path
+    self.workers = max(1, workers)
+    self.templates = Environment(
+      loader=FileSystemLoader(template_dir),
+      autoescape=select_autoescape(['html', 'xml']),
+      auto_reload=False
+    )
+    self._compiled = {}
+    self._local = threading.local()
+    self._wakeup = threading.Event()
+    self._stop = threading.Event()
+    self._start_lock = threading.Lock()
+    self._threads = []
+    self._threads_pid = None
+    self._started = False
+    self._init_outbox()
+    self._compile_templates()
+    atexit.register(self.shutdown)
+    if hasattr(os, 'register_at_fork'):
+      os.register_at_fork(after_in_child=self._after_fork)
+
+  # --- templates -----------------------------------------------------------
+
+  def _compile_templates(self):
+    try:
+      for name in self.templates.list_templates():
+        self._compiled[name] = self.templates.get_template(name)
+      print(f"[DEBUG] MailService compiled {len(self._compiled)} email templates")
+    except Exception as e:
+      print(f"[ERROR] Failed to compile email templates: {str(e)}")
+
+  def render(self, template_name: str, **context) -> str:
+    template = self._compiled.get(template_name)
+    if template is None:
+      template = self._compiled[template_name] = self.templates.get_template(template_name)
+    return template.render(**context)
+
+  # --- outbox --------------------------------------------------------------
+
+  def _db(self) -> sqlite3.Connection:
+    # One connection per thread and process
+    connection = getattr(self._local, 'connection', None)
+    if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+      connection = sqlite3.connect(self.queue_path, timeout=10, isolation_level=None)
+      connection.row_factory = sqlite3.Row
+      connection.execute('PRAGMA journal_mode=WAL')
+      connection.execute('PRAGMA synchronous=NORMAL')
+      self._local.connection = connection
+      self._local.pid = os.getpid()
+    return connection
+
+  def _init_outbox(self):
+    try:
+      os.makedirs(os.path.dirname(self.queue_path), exist_ok=True)
+      self._db().executescript(_SCHEMA)
+    except Exception as e:
+      print(f"[ERROR] Failed to initialize mail outbox at {self.queue_path}: {str(e)}")
+
+  def send(self, subject: str, recipients, html: str = None, text: str = None, sender: str = None) -> int:
+    """Queue a message and return its outbox id; delivery happens in the background."""
+    if isinstance(recipients, str):
+      recipients = [recipients]
+    if not recipients:
+      raise ValueError("At least one recipient is required")
+    now = time.time()
+    cursor = self._db().execute(
+      'INSERT INTO mail_outbox (sender, recipients, subject, text_body, html_body, next_attempt_at, created_at) '
+      'VALUES (?, ?, ?, ?, ?, ?, ?)',
+      (sender or MAIL_DEFAULT_SENDER, json.dumps(list(recipients)), subject, text, html, now, now)
+    )
+    self.start()
+    self._wakeup.set()
+    logger.info(f"Queued email {cursor.lastrowid} '{subject}' to {len(recipients)} recipient(s)")
+    return cursor.lastrowid
+
+  def send_template(self, template_name: str, subject: str, recipients, text: str = None,
+                    sender: str = None, **context) -> int:
+    """Render templates/email/<template_name> with context and queue it."""
+    return self.send(subject, recipients, html=self.render(template_name, **context), text=text, sender=sender)
+
+  def _claim(self):
+    """Atomically claim the next due message for this worker, or return None."""
+    db = self._db()
+    now = time.time()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+      row = db.execute(
+        "SELECT * FROM mail_outbox "
+        "WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND claimed_at <= ?) "
+        "ORDER BY next_attempt_at, id LIMIT 1",
+        (now, now - MAIL_CLAIM_TIMEOUT)
+      ).fetchone()
+      if row is not None:
+        db.execute(
+          "UPDATE mail_outbox SET status = 'sending', claimed_by = ?, claimed_at = ?, attempts = attempts + 1 "
+          "WHERE id = ?",
+          (f"{os.getpid()}:{threading.get_ident()}", now, row['id'])
+        )
+      db.execute('COMMIT')
+    except Exception:
+      db.execute('ROLLBACK')
+      raise
+    return row
+
+  def _mark_sent(self, message_id):
+    self._db().execute('DELETE FROM mail_outbox WHERE id = ?', (message_id,))
+
+  def _mark_failed(self, row, error: Exception, permanent: bool):
+    attempts = row['attempts'] + 1
+    if permanent or attempts >= MAIL_MAX_ATTEMPTS:
+      self._db().execute(
+        "UPDATE mail_outbox SET status = 'failed', claimed_by = NULL, last_error = ? WHERE id = ?",
+        (str(error), row['id'])
+      )
+      logger.error(f"Email {row['id']} '{row['subject']}' failed after {attempts} attempt(s), giving up: {str(error)}")
+      return
+    delay = min(MAIL_RETRY_BACKOFF * (2 ** (attempts - 1)), MAIL_RETRY_BACKOFF_MAX)
+    self._db().execute(
+      "UPDATE mail_outbox SET status = 'pending', claimed_by = NULL, next_attempt_at = ?, last_error = ? WHERE id = ?",
+      (time.time() + delay, str(error), row['id'])
+    )
+    logger.warning(f"Email {row['id']} attempt {attempts} failed, retrying in {delay:.0f}s: {str(error)}")
+
+  def stats(self) -> dict:
+    """Outbox size by status ('sent' messages are removed)."""
+    rows = self._db().execute('SELECT status, COUNT(*) AS n FROM mail_outbox GROUP BY status').fetchall()
+    return {row['status']: row['n'] for row in rows}
+
+  # --- delivery ------------------------------------------------------------
+
+  @staticmethod
+  def _build_message(row) -> EmailMessage:
+    message = EmailMessage()
+    message['Subject'] = row['subject']
+    message['From'] = row['sender']
+    message['To'] = ', '.join(json.loads(row['recipients']))
+    message['Message-ID'] = make_msgid(domain=(row['sender'] or 'localhost').rpartition('@')[2] or None)
+    message.set_content(row['text_body'] or 'This message requires an HTML capable email client.')
+    if row['html_body']:
+      message.add_alternative(row['html_body'], subtype='html')
+    return message
+
+  def _connect(self):
+    if MAIL_USE_SSL:
+      smtp = smtplib.SMTP_SSL(MAIL_SERVER, MAIL_PORT, timeout=MAIL_TIMEOUT)
+    else:
+      smtp = smtplib.SMTP(MAIL_SERVER, MAIL_PORT, timeout=MAIL_TIMEOUT)
+      if MAIL_USE_TLS:
+        smtp.starttls()
+    if MAIL_USERNAME and MAIL_PASSWORD:
+      smtp.login(MAIL_USERNAME, MAIL_PASSWORD)
+    return smtp
+
+  @staticmethod
+  def _close(connection):
+    try:
+      connection['smtp'].quit()
+    except Exception:
+      pass
+    connection['smtp'] = None
+
+  def _deliver(self, row, connection: dict):
+    """Send one message over the worker's SMTP connection, reconnecting once if it dropped."""
+    message = self._build_message(row)
+    for attempt in (1, 2):
+      if connection['smtp'] is None:
+        connection['smtp'] = self._connect()
+      try:
+        refused = connection['smtp'].send_message(message)
+        connection['used_at'] = time.monotonic()
+        if refused:
+          logger.warning(f"Email {row['id']} refused for some recipients: {refused}")
+        return
+      except smtplib.SMTPServerDisconnected:
+        connection['smtp'] = None
+        if attempt == 2:
+          raise
+      except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+        raise PermanentMailError(str(e))
+      except smtplib.SMTPDataError as e:
+        if 500 <= e.smtp_code < 600:
+          raise PermanentMailError(f"{e.smtp_code} {e.smtp_error!r}")
+        raise
+
+  def _run(self):
+    connection = {'smtp': None, 'used_at': 0.0}
+    while not self._stop.is_set():
+      try:
+        row = self._claim()
+      except Exception as e:
+        logger.error(f"Failed to read mail outbox: {str(e)}")
+        row = None
+
+      if row is None:
+        if connection['smtp'] is not None and time.monotonic() - connection['used_at'] > MAIL_CONNECTION_IDLE:
+          self._close(connection)
+        self._wakeup.wait(MAIL_POLL_INTERVAL)
+        self._wakeup.clear()
+        continue
+
+      try:
+        self._deliver(row, connection)
+        self._mark_sent(row['id'])
+        logger.info(f"Email {row['id']} '{row['subject']}' sent")
+      except Exception as e:
+        if connection['smtp'] is not None and not isinstance(e, PermanentMailError):
+          self._close(connection)
+        try:
+          self._mark_failed(row, e, isinstance(e, PermanentMailError))
+        except Exception as db_error:
+          # The claim times out and the message is retried later
+          logger.error(f"Failed to record email {row['id']} failure: {str(db_error)}")
+
+    if connection['smtp'] is not None:
+      self._close(connection)
+
+  # --- lifecycle -----------------------------------------------------------
+
+  def start(self):
+    """Start the worker threads for this process (idempotent)."""
+    if self._threads_pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+      return
+    with self._start_lock:
+      if self._threads_pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+        return
+      self._stop.clear()
+      self._threads = [thread for thread in self._threads if thread.is_alive()] if self._threads_pid == os.getpid() else []
+      while len(self._threads) < self.workers:
+        thread = threading.Thread(target=self._run, name=f"mail-worker-{len(self._threads)}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+      self._threads_pid = os.getpid()
+      self._started = True
+
+  def _after_fork(self):
+    # Threads don't survive fork(); restart them in the child if the parent had them
+    self._threads = []
+    self._threads_pid = None
+    self._local = threading.local()
+    self._start_lock = threading.Lock()
+    if self._started:
+      self.start()
+
+  def shutdown(self, timeout: float = 5):
+    """Stop the workers (registered with atexit); queued mail stays in the outbox."""
+    self._stop.set()
+    self._wakeup.set()
+    if self._threads_pid == os.getpid():
+      for thread in self._threads:
+        thread.join(timeout=timeout)
+
+# Singleton instance
+mail_service = MailService()
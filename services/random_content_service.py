@@ -0,0 +1,129 @@
+import os
+import random
+import logging
+import threading
+import time
+from collections import deque
+from services.content_reposervice import content_repo_service, ContentRepoService
+from utils.cache import TTLCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds before the active-id snapshot is rebuilt even without a write
+RANDOM_CONTENT_REFRESH = float(os.getenv('RANDOM_CONTENT_REFRESH', 300))
+# Per-user rotations are forgotten after this many idle seconds
+RANDOM_CONTENT_ROTATION_TTL = float(os.getenv('RANDOM_CONTENT_ROTATION_TTL', 86400))
+RANDOM_CONTENT_ROW_TTL = float(os.getenv('RANDOM_CONTENT_ROW_TTL', 300))
+# Ids fetched per request while rebuilding the snapshot; stays under PostgREST's max-rows cap
+RANDOM_CONTENT_PAGE_SIZE = int(os.getenv('RANDOM_CONTENT_PAGE_SIZE', 1000))
+# Picks tried when the chosen row vanished since the snapshot was taken
+RANDOM_CONTENT_PICK_ATTEMPTS = 3
+
+class RandomContentService:
+  """Random active content picked from an in-memory snapshot of ids.
+
+  The snapshot holds only the ids of active content_management rows. It is
+  rebuilt every RANDOM_CONTENT_REFRESH seconds or right after any write made
+  through ContentRepoService, so a pick is a local random.choice plus at most
+  one primary-key lookup, and the table is never sorted per request. Logged-in
+  users get a shuffled rotation so nothing repeats until they've seen it all.
+  """
+
+  def __init__(self, repo: ContentRepoService = content_repo_service):
+    self.repo = repo
+    self._ids = ()
+    self._version = 0
+    self._loaded_at = None
+    self._lock = threading.Lock()
+    self._rotations = TTLCache(maxsize=10000, ttl=RANDOM_CONTENT_ROTATION_TTL)
+    # Guards read-pop-write of a rotation; concurrent requests share one per user
+    self._rotation_lock = threading.Lock()
+    self._rows = TTLCache(maxsize=512, ttl=RANDOM_CONTENT_ROW_TTL)
+    repo.add_invalidation_listener(self.invalidate)
+
+  def invalidate(self):
+    """Mark the snapshot stale; it is rebuilt on the next pick."""
+    self._loaded_at = None
+    self._rows.clear()
+
+  def _snapshot(self):
+    loaded_at = self._loaded_at
+    if loaded_at is not None and time.monotonic() - loaded_at < RANDOM_CONTENT_REFRESH:
+      return self._ids, self._version
+    with self._lock:
+      if self._loaded_at is None or time.monotonic() - self._loaded_at >= RANDOM_CONTENT_REFRESH:
+        try:
+          ids = self._load_active_ids()
+          # Per-user rotations are only reshuffled when the set of ids changed
+          if set(ids) != set(self._ids):
+            self._version += 1
+          self._ids = ids
+          self._loaded_at = time.monotonic()
+          logger.info(f"Random content snapshot refreshed: {len(self._ids)} active ids")
+        except Exception as e:
+          # Keep serving the previous snapshot and retry on the next pick
+          logger.error(f"Error refreshing random content snapshot: {str(e)}")
+    return self._ids, self._version
+
+  def _load_active_ids(self):
+    """Fetch every active id in pages, so the max-rows cap can't truncate the snapshot."""
+    ids = []
+    start = 0
+    while True:
+      result = (self.repo.supabase.table('content_management')
+                    .select('id')
+                    .eq('is_active', True)
+                    .order('id')
+                    .range(start, start + RANDOM_CONTENT_PAGE_SIZE - 1)
+                    .execute())
+      rows = result.data or []
+      ids.extend(str(row['id']) for row in rows)
+      if len(rows) < RANDOM_CONTENT_PAGE_SIZE:
+        return tuple(ids)
+      start += RANDOM_CONTENT_PAGE_SIZE
+
+  def pick_id(self, user_id=None):
+    """Return a random active content id, without repeats per user when user_id is given."""
+    ids, version = self._snapshot()
+    if not ids:
+      return None
+    if user_id is None:
+      return random.choice(ids)
+
+    key = str(user_id)
+    with self._rotation_lock:
+      rotation = self._rotations.get(key)
+      if rotation is None or rotation['version'] != version or not rotation['queue']:
+        last = rotation['last'] if rotation else None
+        order = list(ids)
+        random.shuffle(order)
+        # Don't start a new cycle with the item that ended the previous one
+        if len(order) > 1 and order[0] == last:
+          order[0], order[-1] = order[-1], order[0]
+        rotation = {'version': version, 'queue': deque(order), 'last': last}
+      picked = rotation['queue'].popleft()
+      rotation['last'] = picked
+      self._rotations.set(key, rotation)
+    return picked
+
+  def get_random_content(self, user_id=None):
+    """Return a random active content row as a dict, or None if there is none."""
+    for _ in range(RANDOM_CONTENT_PICK_ATTEMPTS):
+      content_id = self.pick_id(user_id)
+      if content_id is None:
+        return None
+      row = self._rows.get(content_id)
+      if row is not None:
+        return row
+      result = self.repo.get_content_by_id(content_id)
+      row = result.data[0] if result and result.data else None
+      if row is not None and row.get('is_active', True):
+        self._rows.set(content_id, row)
+        return row
+      # Removed or deactivated since the snapshot was taken; rebuild it and pick again
+      self.invalidate()
+    return None
+
+# Singleton instance
+random_content_service = RandomContentService()
@@ -0,0 +1,130 @@
+import os
+import time
+import logging
+import threading
+from config import init_supabase
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Tables whose column metadata is loaded at startup
+SCHEMA_TABLES = tuple(
+  table.strip() for table in os.getenv(
+    'SCHEMA_TABLES',
+    'clients,user_accounts,psychologists,guidance_counselors,admin_users,content_management,audit_trail'
+  ).split(',') if table.strip()
+)
+# A failed load is retried at most this often
+SCHEMA_RETRY_INTERVAL = float(os.getenv('SCHEMA_RETRY_INTERVAL', 60))
+
+class SchemaService:
+  """Cached table and column metadata for the public schema.
+
+  load() fetches the columns of SCHEMA_TABLES in one round trip, through the
+  schema_columns() function (20251017_schema_columns_function.sql), or
+  PostgREST's OpenAPI description if that isn't deployed. Repositories then
+  check columns and trim payloads against the cache instead of probing with
+  trial writes. refresh() reloads on demand, e.g. after a migration.
+  """
+
+  def __init__(self, tables=SCHEMA_TABLES):
+    self.tables = tuple(tables)
+    self._columns = None
+    self._lock = threading.Lock()
+    self._warned = set()
+    self._failed_at = None
+
+  def _client(self):
+    return init_supabase(service_role=True)
+
+  def _load_from_function(self, client):
+    result = client.rpc('schema_columns', {'p_tables': list(self.tables)}).execute()
+    columns = {}
+    for row in result.data or []:
+      columns.setdefault(row['table_name'], {})[row['column_name']] = {
+        'type': row.get('data_type'),
+        'nullable': row.get('is_nullable'),
+        'has_default': row.get('has_default')
+      }
+    return columns
+
+  def _load_from_openapi(self, client):
+    response = client.postgrest.session.get('/')
+    response.raise_for_status()
+    definitions = response.json().get('definitions', {})
+    columns = {}
+    for table in self.tables:
+      definition = definitions.get(table)
+      if not definition:
+        continue
+      required = set(definition.get('required', []))
+      columns[table] = {
+        name: {'type': spec.get('format'), 'nullable': name not in required, 'has_default': 'default' in spec}
+        for name, spec in definition.get('properties', {}).items()
+      }
+    return columns
+
+  def load(self, force: bool = False) -> dict:
+    """Load (once) and return {table: {column: metadata}}; empty if unavailable."""
+    if not force and (self._columns is not None or self._recently_failed()):
+      return self._columns or {}
+    with self._lock:
+      if not force and (self._columns is not None or self._recently_failed()):
+        return self._columns or {}
+      columns = None
+      try:
+        client = self._client()
+        try:
+          columns = self._load_from_function(client)
+        except Exception as e:
+          logger.info(f"schema_columns() unavailable, using the OpenAPI description: {str(e)}")
+          columns = self._load_from_openapi(client)
+        print(f"[DEBUG] Schema loaded for {len(columns)} tables: {', '.join(sorted(columns))}")
+      except Exception as e:
+        print(f"[ERROR] Failed to load schema metadata: {str(e)}")
+        self._failed_at = time.monotonic()
+      # On failure keep what we had; callers treat unknown tables permissively
+      if columns is not None:
+        self._columns = columns
+        self._failed_at = None
+        self._warned.clear()
+      return self._columns or {}
+
+  def _recently_failed(self) -> bool:
+    return self._failed_at is not None and time.monotonic() - self._failed_at < SCHEMA_RETRY_INTERVAL
+
+  def refresh(self) -> dict:
+    return self.load(force=True)
+
+  def preload(self):
+    """Load in the background so startup isn't blocked on the round trip."""
+    threading.Thread(target=self.load, name='schema-preload', daemon=True).start()
+
+  def columns(self, table: str):
+    """Column names of table, or None when its schema isn't known."""
+    table_columns = self.load().get(table)
+    return frozenset(table_columns) if table_columns else None
+
+  def has_columns(self, table: str, *names, default: bool = True) -> bool:
+    """Whether table has every column in names; default when the schema is unknown."""
+    known = self.columns(table)
+    if known is None:
+      return default
+    return all(name in known for name in names)
+
+  def filter_payload(self, table: str, payload: dict) -> dict:
+    """Drop keys that aren't columns of table, so the write can't fail on them."""
+    known = self.columns(table)
+    if known is None:
+      return payload
+    dropped = [key for key in payload if key not in known]
+    if dropped:
+      warning_key = (table, tuple(sorted(dropped)))
+      if warning_key not in self._warned:
+        self._warned.add(warning_key)
+        logger.warning(f"Ignoring fields not present in {table}: {', '.join(dropped)}")
+      payload = {key: value for key, value in payload.items() if key in known}
+    return payload
+
+# Singleton instance
+schema_service = SchemaService()
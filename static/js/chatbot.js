@@ -17,6 +17,8 @@ function saveMessage(message, isUser) {
 function clearChatHistory() {
     localStorage.removeItem('chatHistory');
     chatMessages.innerHTML = '';
+    // Conversation memory (topic, facts) lives on the server
+    fetch('/chatbot/reset', { method: 'POST' }).catch(() => {});
 }
 
 function addMessage(message, isUser, save = true) {
@@ -68,52 +70,26 @@ function addMessage(message, isUser, save = true) {
     chatMessages.scrollTop = chatMessages.scrollHeight;
 }
 
-let lastTopic = null;
-let userFacts = JSON.parse(localStorage.getItem('userFacts') || '{}');
+// Facts used to be kept client-side; they are now stored on the server
+localStorage.removeItem('userFacts');
 
-function extractUserFacts(message) {
-    // Simple extraction for name, mood, activity
-    let updated = false;
-    const nameMatch = message.match(/my name is ([a-zA-Z\u00C0-\u017F ]+)/i);
-    if (nameMatch) {
-        userFacts.name = nameMatch[1].trim();
-        updated = true;
-    }
-    const moodMatch = message.match(/i feel ([a-zA-Z\u00C0-\u017F ]+)/i);
-    if (moodMatch) {
-        userFacts.mood = moodMatch[1].trim();
-        updated = true;
-    }
-    const likeMatch = message.match(/i like ([a-zA-Z\u00C0-\u017F ]+)/i);
-    if (likeMatch) {
-        userFacts.favorite = likeMatch[1].trim();
-        updated = true;
-    }
-    if (updated) {
-        localStorage.setItem('userFacts', JSON.stringify(userFacts));
-    }
+// Prefer one persistent Socket.IO connection; fall back to HTTP POSTs
+let socket = null;
+if (window.io) {
+    socket = io({ transports: ['websocket', 'polling'] });
+    socket.on('chat_response', (data) => addMessage(data.message, false));
 }
 
-async function sendMessage() {
-    const message = chatInput.value.trim();
-    if (!message) return;
-    addMessage(message, true);
-    extractUserFacts(message);
-    chatInput.value = '';
+async function postMessage(message) {
     try {
         const response = await fetch('/chatbot/message', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ message, last_topic: lastTopic, user_facts: userFacts })
+            body: JSON.stringify({ message })
         });
         if (response.ok) {
             const data = await response.json();
             addMessage(data.reply, false);
-            lastTopic = data.topic || lastTopic;
-            if (data.user_facts) {
-                userFacts = data.user_facts;
-                localStorage.setItem('userFacts', JSON.stringify(userFacts));
-            }
         } else {
             addMessage('Sorry, something went wrong. Please try again.', false);
         }
@@ -122,6 +98,18 @@ async function sendMessage() {
     }
 }
 
+async function sendMessage() {
+    const message = chatInput.value.trim();
+    if (!message) return;
+    addMessage(message, true);
+    chatInput.value = '';
+    if (socket && socket.connected) {
+        socket.emit('chat_message', { message });
+    } else {
+        await postMessage(message);
+    }
+}
+
 
 
 // Add event listeners
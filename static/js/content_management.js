@@ -8,6 +8,10 @@ let currentContentId = null;
 let contentTable = null;
 let selectedItems = new Set();
 let currentBulkAction = null;
+// Server-side filters for /content/rows (status, content_type, q)
+let currentFilters = {};
+// url -> {etag, payload}; lets unchanged pages come back as an empty 304
+const rowsCache = new Map();
 
 // Get CSRF token from the form
 function getCSRFToken() {
@@ -32,165 +36,168 @@ $(document).ready(function() {
 });
 
 function loadContentList(filters = {}) {
-    // Properly destroy existing DataTable
-    if ($.fn.DataTable.isDataTable('#contentTable')) {
-        $('#contentTable').DataTable().clear().destroy();
-        $('#contentTable').empty();
-    }
-    
-    const params = new URLSearchParams(filters).toString();
-    const url = '/content/list' + (params ? '?' + params : '');
+    currentFilters = filters;
     
     // Clear selection when loading new content
     selectedItems.clear();
     updateBulkActionsBar();
     
-    $.get(url)
-        .done(function(response) {
-            $('#contentTable').html(response.html);
-            // Small delay to ensure DOM is ready
-            setTimeout(() => {
-                initializeDataTable();
-                initializeBulkActions();
-            }, 100);
-        })
-        .fail(function(xhr) {
-            showAlert('error', 'Failed to load content list: ' + xhr.responseJSON?.error || 'Unknown error');
-        });
+    if (contentTable) {
+        // ajax.reload() goes back to the first page with the new filters
+        contentTable.ajax.reload();
+    } else {
+        initializeDataTable();
+    }
 }
 
+function fetchContentRows(params) {
+    const url = '/content/rows?' + new URLSearchParams(params).toString();
+    const cached = rowsCache.get(url);
+    
+    return $.ajax({
+        url: url,
+        method: 'GET',
+        dataType: 'json',
+        headers: cached ? { 'If-None-Match': cached.etag } : {}
+    }).then(function(payload, textStatus, xhr) {
+        if (xhr.status === 304 && cached) {
+            return cached.payload;
+        }
+        const etag = xhr.getResponseHeader('ETag');
+        if (etag) {
+            rowsCache.set(url, { etag: etag, payload: payload });
+        }
+        return payload;
+    });
+}
+
+function escapeHtml(value) {
+    return $('<div>').text(value == null ? '' : String(value)).html();
+}
+
+function formatDate(dateString) {
+    const date = new Date(dateString);
+    return isNaN(date) ? '' : date.toLocaleDateString('en-US', { month: '2-digit', day: '2-digit', year: 'numeric' });
+}
+
+function formatTime(dateString) {
+    const date = new Date(dateString);
+    return isNaN(date) ? '' : date.toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit' });
+}
+
+const contentColumns = [
+    {
+        data: 'id',
+        render: (id) => `<div class="form-check">
+                <input class="form-check-input item-checkbox" type="checkbox" value="${escapeHtml(id)}" id="selectContent${escapeHtml(id)}"${selectedItems.has(String(id)) ? ' checked' : ''}>
+            </div>`
+    },
+    {
+        data: 'content_type',
+        render: (type) => `<span class="badge bg-info">${escapeHtml(formatContentType(type || 'general') || 'General')}</span>`
+    },
+    {
+        data: 'author',
+        render: (author, type, row) => `<div class="d-flex align-items-center"><div>
+                <div class="fw-bold">${escapeHtml(author)}</div>
+                ${row.created_by ? `<small class="text-muted">by ${escapeHtml(row.created_by)}</small>` : ''}
+            </div></div>`
+    },
+    {
+        data: 'messages',
+        render: (messages) => {
+            const text = messages || '';
+            return `<div class="text-truncate" style="max-width: 300px;" title="${escapeHtml(text)}">
+                ${escapeHtml(text.substring(0, 100))}${text.length > 100 ? '...' : ''}
+            </div>`;
+        }
+    },
+    {
+        data: 'is_active',
+        render: (isActive) => `<span class="badge bg-${isActive ? 'success' : 'secondary'}">${isActive ? 'Active' : 'Inactive'}</span>`
+    },
+    {
+        data: 'created_at',
+        render: (createdAt, type, row) => `<div>${formatDate(createdAt)}</div>
+            <small class="text-muted">${formatTime(createdAt)}</small>
+            ${row.updated_at && row.updated_at !== createdAt ? `<div><small class="text-info">Updated: ${formatDate(row.updated_at)}</small></div>` : ''}`
+    },
+    {
+        data: 'id',
+        render: (id, type, row) => {
+            const safeId = escapeHtml(id);
+            return `<div class="d-flex justify-content-center align-items-center gap-1">
+                <button class="btn btn-info btn-sm view-content" data-content-id="${safeId}" title="View Content">
+                    <i class="fas fa-eye"></i>
+                </button>
+                <button class="btn btn-primary btn-sm edit-content" data-content-id="${safeId}" title="Edit Content">
+                    <i class="fas fa-edit"></i>
+                </button>
+                <button class="btn btn-${row.is_active ? 'secondary' : 'success'} btn-sm toggle-status" data-content-id="${safeId}" data-status="${row.is_active}" title="${row.is_active ? 'Deactivate' : 'Activate'}">
+                    <i class="fas fa-${row.is_active ? 'toggle-on' : 'toggle-off'}"></i>
+                </button>
+                <button class="btn btn-danger btn-sm delete-content" data-content-id="${safeId}" title="Delete Content">
+                    <i class="fas fa-trash"></i>
+                </button>
+            </div>`;
+        }
+    }
+];
+
 function initializeDataTable() {
     // Ensure table exists before initializing
     if ($('#contentTable').length === 0) {
         return;
     }
     
-    // Check if table has proper structure (thead and tbody)
-    const $table = $('#contentTable');
-    const $thead = $table.find('thead');
-    const $tbody = $table.find('tbody');
-    
-    if ($thead.length === 0 || $thead.find('tr th').length === 0) {
-        return;
-    }
-    
-    // Validate table structure integrity
-    const headerColumnCount = $thead.find('tr:first th').length;
-    const hasValidStructure = headerColumnCount > 0;
-    
-    if (!hasValidStructure) {
-        return;
-    }
-    
-    // Check if tbody exists, if not create it
-    if ($tbody.length === 0) {
-        $table.append('<tbody></tbody>');
-        $tbody = $table.find('tbody'); // Update reference
-    }
-    
-    // Handle empty table case - add a temporary row to prevent DataTables errors
-    let $dataRows = $tbody.find('tr');
-    let addedPlaceholderRow = false;
-    
-    if ($dataRows.length === 0) {
-        // Add a hidden placeholder row with correct number of cells
-        let placeholderCells = '';
-        for (let i = 0; i < headerColumnCount; i++) {
-            placeholderCells += '<td></td>';
-        }
-        $tbody.append(`<tr id="placeholder-row" style="display: none;">${placeholderCells}</tr>`);
-        addedPlaceholderRow = true;
-        $dataRows = $tbody.find('tr'); // Update reference
-    }
-    
-    // Validate row structure if data rows exist
-    if ($dataRows.length > 0) {
-        const visibleRows = $dataRows.filter(':visible');
-        if (visibleRows.length > 0) {
-            const firstRowCellCount = visibleRows.first().find('td').length;
-            if (firstRowCellCount !== headerColumnCount) {
-                // Don't return, let DataTables handle it
-            }
-        }
-    }
-    
-    try {
-        // Use a more conservative column configuration
-        const columnCount = headerColumnCount;
-        
-        let columnDefs = [];
-        let orderColumn = Math.min(5, columnCount - 1); // Safe order column
-        
-        // More conservative column definitions
-        if (columnCount >= 9) {
-            // Standard content table: checkbox, content_type, author, messages, status, date, actions, hidden_status, hidden_contenttype
-            columnDefs = [
-                { orderable: false, targets: [0] }, // Checkbox column
-                { orderable: false, targets: [6] }, // Actions column (column 6)
-                { visible: false, targets: [7, 8] }, // Hidden columns (hidden_status, hidden_contenttype) - DataTables will hide these
-                { searchable: false, targets: [0, 6, 7, 8] } // Non-searchable columns
-            ];
-            orderColumn = 5; // Date created column
-        } else if (columnCount >= 7) {
-            columnDefs = [
-                { orderable: false, targets: [0] }, // Checkbox column
-                { orderable: false, targets: [6] }, // Actions column (column 6)
-                { visible: false, targets: [7, 8] }, // Hidden columns (hidden_status, hidden_contenttype) - DataTables will hide these
-                { searchable: false, targets: [0, 6, 7, 8] } // Non-searchable columns
-            ];
-            orderColumn = 5; // Date created column
-        } else if (columnCount > 2) {
-            columnDefs = [
-                { orderable: false, targets: [columnCount - 1] } // Last column
-            ];
-            orderColumn = Math.max(1, columnCount - 2);
-        }
-        
-        // Ensure order column is valid
-        if (orderColumn >= columnCount) {
-            orderColumn = Math.max(0, columnCount - 1);
-        }
-        
-        contentTable = $('#contentTable').DataTable({
-            order: [[orderColumn, 'desc']],
-            pageLength: 25,
-            responsive: true,
-            columnDefs: columnDefs,
-            autoWidth: false,
-            processing: false,
-            language: {
-                lengthMenu: "Show _MENU_ contents per page",
-                zeroRecords: "No matching contents found",
-                info: "Showing _START_ to _END_ of _TOTAL_ contents",
-                infoEmpty: "No contents available",
-                infoFiltered: "(filtered from _MAX_ total contents)"
-            },
-            dom: "<'row'<'col-sm-12'l>>" +
-                "<'row'<'col-sm-12'tr>>" +
-                "<'row'<'col-sm-12 col-md-5'i><'col-sm-12 col-md-7'p>>",
-            drawCallback: function() {
-                // Re-initialize bulk action event handlers after table redraw
-                try {
-                    initializeBulkActions();
-                } catch (e) {
-                    // Silently handle error
-                }
+    contentTable = $('#contentTable').DataTable({
+        // Rows are paged, filtered and searched on the server
+        serverSide: true,
+        processing: true,
+        ordering: false,
+        searching: false,
+        pageLength: 25,
+        responsive: true,
+        autoWidth: false,
+        columns: contentColumns,
+        ajax: function(data, callback) {
+            const params = Object.assign({}, currentFilters, { limit: data.length, offset: data.start });
+            fetchContentRows(params)
+                .done(function(payload) {
+                    // Search results aren't counted; report one more page while there is one
+                    const total = payload.total !== null ? payload.total
+                        : payload.offset + payload.rows.length + (payload.has_more ? payload.limit : 0);
+                    callback({ draw: data.draw, recordsTotal: total, recordsFiltered: total, data: payload.rows });
+                })
+                .fail(function(xhr) {
+                    showAlert('error', 'Failed to load content list: ' + (xhr.responseJSON?.error || 'Unknown error'));
+                    callback({ draw: data.draw, recordsTotal: 0, recordsFiltered: 0, data: [] });
+                });
+        },
+        createdRow: function(row, data) {
+            $(row).attr('data-content-id', data.id)
+                .attr('data-status', data.is_active ? 'active' : 'inactive')
+                .attr('data-content-type', (data.content_type || 'general').toLowerCase());
+        },
+        language: {
+            lengthMenu: "Show _MENU_ contents per page",
+            zeroRecords: "No content found",
+            info: "Showing _START_ to _END_ of _TOTAL_ contents",
+            infoEmpty: "No contents available",
+            processing: "Loading..."
+        },
+        dom: "<'row'<'col-sm-12'l>>" +
+            "<'row'<'col-sm-12'tr>>" +
+            "<'row'<'col-sm-12 col-md-5'i><'col-sm-12 col-md-7'p>>",
+        drawCallback: function() {
+            // Re-initialize bulk action event handlers after table redraw
+            try {
+                initializeBulkActions();
+            } catch (e) {
+                // Silently handle error
             }
-        });
-        
-        // Remove placeholder row if it was added
-        if (addedPlaceholderRow) {
-            setTimeout(() => {
-                $('#placeholder-row').remove();
-            }, 100);
         }
-        
-    } catch (error) {
-        // Clean up placeholder row on error
-        if (addedPlaceholderRow) {
-            $('#placeholder-row').remove();
-        }
-    }
+    });
 }
 
 function initializeEventHandlers() {
@@ -415,128 +422,45 @@ function toggleContentStatus(contentId) {
 
 function searchContent() {
     const query = $('#searchInput').val().trim();
+    // Search combines with the active status/type filter
+    const filters = Object.assign({}, currentFilters);
     if (query) {
-        // Clear selection when searching
-        selectedItems.clear();
-        updateBulkActionsBar();
-        
-        // Properly destroy existing DataTable
-        if ($.fn.DataTable.isDataTable('#contentTable')) {
-            $('#contentTable').DataTable().clear().destroy();
-            $('#contentTable').empty();
-        }
-        
-        $.get(`/content/search?q=${encodeURIComponent(query)}`)
-            .done(function(response) {
-                $('#contentTable').html(response.html);
-                // Small delay to ensure DOM is ready
-                setTimeout(() => {
-                    initializeDataTable();
-                    initializeBulkActions();
-                }, 100);
-            })
-            .fail(function(xhr) {
-                showAlert('error', 'Search failed: ' + (xhr.responseJSON?.error || 'Unknown error'));
-            });
+        filters.q = query;
     } else {
-        loadContentList();
+        delete filters.q;
     }
+    loadContentList(filters);
 }
 
 function applyFilter(filter) {
-    // Clear selection when applying filters
-    selectedItems.clear();
-    updateBulkActionsBar();
+    // Filters are applied server-side so only the visible page is transferred
+    let filters = {};
     
-    // If DataTable is initialized, use client-side filtering for immediate response
-    if ($.fn.DataTable.isDataTable('#contentTable')) {
-        const table = $('#contentTable').DataTable();
-        
-        // Clear any existing search
-        table.search('').draw();
-        
-        // Remove any existing custom search functions
-        $.fn.dataTable.ext.search = [];
-        // Apply custom filter based on hidden columns
-        if (filter && filter !== 'all') {
-            $.fn.dataTable.ext.search.push(function(settings, data, dataIndex, rowData, counter) {
-                // Try to get the actual table instance
-                const table = $('#contentTable').DataTable();
-                const row = table.row(dataIndex);
-                const $row = $(row.node());
-                
-                // Get status and content type from data attributes on the row
-                const statusFromAttr = $row.attr('data-status');
-                const contentTypeFromAttr = $row.attr('data-content-type');
-                
-                // Also try from the data array (columns 7 and 8)
-                const statusFromData = data[7];
-                const contentTypeFromData = data[8];
-                
-                // Use data attributes as primary source, fall back to column data
-                let status = statusFromAttr || statusFromData || 'inactive';
-                let contentType = contentTypeFromAttr || contentTypeFromData || 'general';
-                
-                // Fallback: if status is from visible column (capitalized), convert to lowercase
-                if (!statusFromAttr && !statusFromData && data[4]) {
-                    const visibleStatus = data[4];
-                    if (typeof visibleStatus === 'string') {
-                        if (visibleStatus.includes('Active')) {
-                            status = 'active';
-                        } else if (visibleStatus.includes('Inactive')) {
-                            status = 'inactive';
-                        }
-                    }
-                }
-                
-                switch(filter) {
-                    case 'active':
-                        return status === 'active'; // hidden_status column
-                    case 'inactive':
-                        return status === 'inactive'; // hidden_status column
-                    case 'general':
-                    case 'mental_health':
-                    case 'educational':
-                    case 'motivational':
-                    case 'awareness':
-                    case 'announcement':
-                        return contentType === filter; // hidden_contenttype column
-                    default:
-                        return true;
-                }
-            });
-        }
-        
-        // Redraw table with filter applied
-        table.draw();
-        
-    } else {
-        // Fall back to server-side filtering if DataTable not initialized
-        let filters = {};
-        
-        switch(filter) {
-            case 'active':
-                filters.status = 'active';
-                break;
-            case 'inactive':
-                filters.status = 'inactive';
-                break;
-            case 'general':
-            case 'mental_health':
-            case 'educational':
-            case 'motivational':
-            case 'awareness':
-            case 'announcement':
-                filters.content_type = filter;
-                break;
-            case 'all':
-            default:
-                filters = {};
-                break;
-        }
-        
-        loadContentList(filters);
+    switch(filter) {
+        case 'active':
+            filters.status = 'active';
+            break;
+        case 'inactive':
+            filters.status = 'inactive';
+            break;
+        case 'general':
+        case 'mental_health':
+        case 'educational':
+        case 'motivational':
+        case 'awareness':
+        case 'announcement':
+            filters.content_type = filter;
+            break;
+        case 'all':
+        default:
+            filters = {};
+            break;
+    }
+    
+    if (currentFilters.q) {
+        filters.q = currentFilters.q;
     }
+    loadContentList(filters);
 }
 
 function refreshContentList() {
@@ -549,19 +473,6 @@ function refreshContentList() {
     $('#filterDropdown').html('<i class="fas fa-filter"></i> Filter');
     $('.filter-option').removeClass('active');
     
-    // Clear custom DataTable search functions
-    $.fn.dataTable.ext.search = [];
-    
-    // Properly destroy existing DataTable
-    if ($.fn.DataTable.isDataTable('#contentTable')) {
-        $('#contentTable').DataTable().clear().destroy();
-        $('#contentTable').empty();
-    }
-    
-    // Clear selection
-    selectedItems.clear();
-    updateBulkActionsBar();
-    
     // Reload content list
     loadContentList();
     showAlert('info', 'Content list refreshed');
@@ -1,61 +1,81 @@
 from functools import wraps
 from flask import request, session
 from flask_login import current_user
-from services.audit_trail_reposervice import audit_trail_service
+from services.audit_writer import audit_writer
 from models.audit_trail import AuditTrailModel
 import json
 
+def _status_code(result) -> int:
+    """Status of a view's return value: a Response, a (body, status[, headers]) tuple or a body."""
+    if isinstance(result, tuple) and len(result) > 1 and isinstance(result[1], int):
+        return result[1]
+    return getattr(result, 'status_code', 200)
+
+def log_audit(action: str, resource_type: str, resource_id=None, details: dict = None):
+    """Queue an audit entry for the current user and request.
+
+    Nothing is logged for anonymous requests. Failures are printed and
+    swallowed so auditing never fails the original request.
+    """
+    try:
+        # Get user info
+        user_id = getattr(current_user, 'user_id', None) if current_user.is_authenticated else None
+        print(f"[DEBUG] AuditTrail Current user ID: {user_id}", {current_user})
+        if not user_id:
+            return
+        username = getattr(current_user, 'username', 'Unknown') if current_user.is_authenticated else 'Anonymous'
+        print(f"[DEBUG] AuditTrail username: {username}")
+        # Get request details
+        ip_address = request.environ.get('HTTP_X_FORWARDED_FOR') or request.environ.get('REMOTE_ADDR')
+        user_agent = request.environ.get('HTTP_USER_AGENT')
+        session_id = session.get('session_id')
+        
+        # Create audit trail entry
+        audit_data = AuditTrailModel(
+            user_id=user_id,
+            action=action,
+            resource_type=resource_type,
+            resource_id=str(resource_id) if resource_id else None,
+            details=details or {},
+            ip_address=ip_address,
+            user_agent=user_agent,
+            session_id=session_id,
+            username=username
+        )
+        
+        # Queue the action; the background writer batches the inserts
+        audit_writer.enqueue(audit_data)
+    except Exception as e:
+        print(f"[ERROR] Failed to log audit trail: {str(e)}")
+
 def audit_action(action: str, resource_type: str):
-    """Decorator to automatically log user actions"""
+    """Decorator to automatically log user actions.
+
+    Only successful responses are logged, so a request rejected with 403 or
+    failing with 500 isn't recorded as the action having happened.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Execute the original function first
             result = func(*args, **kwargs)
+            if _status_code(result) >= 400:
+                return result
             
+            # Get resource ID from kwargs or args
+            resource_id = kwargs.get('id') or kwargs.get('user_id') or (args[0] if args else None)
+            # Get request data for details
+            details = {}
             try:
-                # Get user info
-                user_id = getattr(current_user, 'user_id', None) if current_user.is_authenticated else None
-                print(f"[DEBUG] AuditTrail Current user ID: {user_id}", {current_user})
-                if user_id:
-                    # Get resource ID from kwargs or args
-                    resource_id = kwargs.get('id') or kwargs.get('user_id') or (args[0] if args else None)
-                    username = getattr(current_user, 'username', 'Unknown') if current_user.is_authenticated else 'Anonymous'
-                    print(f"[DEBUG] AuditTrail username: {username}")
-                    # Get request details
-                    ip_address = request.environ.get('HTTP_X_FORWARDED_FOR') or request.environ.get('REMOTE_ADDR')
-                    user_agent = request.environ.get('HTTP_USER_AGENT')
-                    session_id = session.get('session_id')
-                    
-                    # Get request data for details
-                    details = {}
-                    if request.method in ['POST', 'PUT', 'PATCH']:
-                        if request.is_json:
-                            details = request.get_json() or {}
-                        else:
-                            details = dict(request.form)
-                    
-                    # Create audit trail entry
-                    audit_data = AuditTrailModel(
-                        user_id=user_id,
-                        action=action,
-                        resource_type=resource_type,
-                        resource_id=str(resource_id) if resource_id else None,
-                        details=details,
-                        ip_address=ip_address,
-                        user_agent=user_agent,
-                        session_id=session_id,
-                        username=username
-                    )
-                    
-                    # Log the action
-                    audit_trail_service.log_action(audit_data)
-                print(f"[DEBUG] AuditTrail Current user ID: {user_id}")
+                if request.method in ['POST', 'PUT', 'PATCH']:
+                    if request.is_json:
+                        details = request.get_json() or {}
+                    else:
+                        details = dict(request.form)
             except Exception as e:
-                print(f"[ERROR] Failed to log audit trail: {str(e)}")
-                # Don't fail the original request if audit logging fails
-                pass
+                print(f"[ERROR] Failed to read audit details: {str(e)}")
+            log_audit(action, resource_type, resource_id, details)
             
             return result
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,126 @@
+import io
+import os
+import csv
+import json
+import uuid
+import logging
+from datetime import datetime
+from flask import Response, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per keyset query while streaming an export
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Spreadsheet apps treat cells starting with these as formulas
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def validate_keyset_position(value, row_id):
+    """Check a (timestamp, id) keyset position before it goes into a filter.
+
+    Positions decoded from client cursors end up inside a PostgREST or_()
+    string, so the timestamp must parse as an ISO datetime and the id must be
+    an integer or a UUID. Raises ValueError otherwise.
+    """
+    if not isinstance(value, str):
+        raise ValueError("Invalid cursor timestamp")
+    datetime.fromisoformat(value)
+    if isinstance(row_id, bool) or not isinstance(row_id, (int, str)):
+        raise ValueError("Invalid cursor id")
+    if isinstance(row_id, str):
+        row_id = str(uuid.UUID(row_id))
+    return value, row_id
+
+
+def keyset_filter(sort_column: str, value, row_id) -> str:
+    """PostgREST or_() filter for the rows after (value, row_id) in descending order."""
+    value, row_id = validate_keyset_position(value, row_id)
+    return f'{sort_column}.lt."{value}",and({sort_column}.eq."{value}",id.lt."{row_id}")'
+
+
+def iter_keyset(build_query, sort_column: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield every row of a query, newest first, in keyset-ordered chunks.
+
+    build_query() must return a fresh filtered PostgREST select; each chunk
+    seeks past the last (sort_column, id) seen, so memory stays at one chunk
+    and deep chunks cost the same as the first. Errors propagate.
+    """
+    position = None
+    while True:
+        query = build_query()
+        if position:
+            query = query.or_(keyset_filter(sort_column, *position))
+        rows = (query.order(sort_column, desc=True)
+                     .order('id', desc=True)
+                     .limit(chunk_size)
+                     .execute()).data or []
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        position = (rows[-1][sort_column], rows[-1]['id'])
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_lines(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    writer.writerow(columns)
+    yield flush()
+    for row in rows:
+        writer.writerow([_csv_cell(row.get(column)) for column in columns])
+        yield flush()
+
+
+def _jsonl_lines(rows, columns):
+    for row in rows:
+        yield json.dumps({column: row.get(column) for column in columns}, default=str) + '\n'
+
+
+def export_response(rows, fmt: str, columns, basename: str) -> Response:
+    """Stream rows as a CSV or JSONL download without buffering them.
+
+    rows is any iterable (normally iter_keyset); it is consumed lazily while
+    the response is written. A failure halfway through can no longer change
+    the status code, so it is logged and marked on the last line instead.
+    """
+    fmt = fmt if fmt in EXPORT_FORMATS else 'csv'
+    lines = _csv_lines(rows, columns) if fmt == 'csv' else _jsonl_lines(rows, columns)
+
+    def generate():
+        try:
+            yield from lines
+        except Exception as e:
+            logger.error(f"Export {basename} failed while streaming: {str(e)}")
+            if fmt == 'csv':
+                yield f"# export incomplete: {str(e)}\n"
+            else:
+                yield json.dumps({'error': 'export incomplete', 'detail': str(e)}) + '\n'
+
+    filename = f"{basename}_{datetime.now():%Y%m%d_%H%M%S}.{fmt}"
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    # Let nginx pass chunks through instead of buffering the whole download
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,46 @@
+from functools import wraps
+from flask import current_app, flash, g, redirect, request, url_for
+from utils.rate_limit import login_rate_limiter
+
+
+def login_limiter(f):
+    """Limit login POSTs per client IP, and failed logins per submitted email.
+
+    Attempts are counted in the shared limiter storage (utils.rate_limit),
+    so clearing cookies or landing on another worker doesn't reset them.
+    The view sets g.login_failed on a wrong password; only then does the
+    attempt count against the account.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Skip rate limiting in development
+        if current_app.config.get('ENV') == 'development':
+            return f(*args, **kwargs)
+
+        ip_address = request.remote_addr
+        email = (request.form.get('email') or '').strip().lower() or None
+
+        try:
+            allowed, retry_after, remaining = login_rate_limiter.hit(ip_address, email)
+        except Exception as e:
+            # Never lock everyone out because the limiter storage is unavailable
+            print(f"[ERROR] Login rate limiter unavailable: {str(e)}")
+            return f(*args, **kwargs)
+
+        if not allowed:
+            minutes, seconds = divmod(retry_after, 60)
+            print(f"[LOGIN] Login attempts exhausted for {email or 'unknown account'} from {ip_address}")
+            flash(f'Too many login attempts. Please try again in {minutes}m {seconds}s.', 'danger')
+            return redirect(url_for('login_selector')), 429  # 429: Too Many Requests
+
+        # Log the attempt
+        print(f"[LOGIN] Login attempt from {ip_address}, {remaining} attempts left in window")
+
+        response = f(*args, **kwargs)
+        if g.get('login_failed'):
+            try:
+                login_rate_limiter.record_failure(email)
+            except Exception as e:
+                print(f"[ERROR] Login rate limiter unavailable: {str(e)}")
+        return response
+    return decorated_function
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Structured timing records, one JSON line per traced operation
+logger = logging.getLogger('metrics')
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = tuple(
+    float(bound) for bound in os.getenv(
+        'LATENCY_BUCKETS', '0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10'
+    ).split(',')
+)
+# Emit a structured log line per traced operation
+METRICS_LOG_SPANS = os.getenv('METRICS_LOG_SPANS', 'true').lower() == 'true'
+
+
+class _Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Trace:
+    """Per-stage timings of one operation, e.g. a single login."""
+
+    def __init__(self, metrics, operation: str):
+        self.metrics = metrics
+        self.operation = operation
+        self.spans = {}
+        self.outcome = 'ok'
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time the enclosed block as stage; errors are recorded and re-raised."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.outcome = 'error'
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def record(self, stage: str, seconds: float):
+        """Record a stage timed elsewhere, e.g. in another thread."""
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+    def finish(self, outcome: str = None):
+        if outcome:
+            self.outcome = outcome
+        self.metrics.observe_trace(self, time.perf_counter() - self.started)
+
+
+class LatencyMetrics:
+    """In-process latency histograms per operation, stage and outcome.
+
+    Each worker process keeps its own histograms; /metrics reports the
+    worker that served the scrape, labelled with its pid. For fleet-wide
+    percentiles aggregate the structured ``metrics`` log lines instead,
+    which carry every span of every traced operation.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def trace(self, operation: str) -> Trace:
+        return Trace(self, operation)
+
+    def observe(self, operation: str, stage: str, outcome: str, seconds: float):
+        key = (operation, stage, outcome)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def observe_trace(self, trace: Trace, total: float):
+        for stage, seconds in trace.spans.items():
+            self.observe(trace.operation, stage, trace.outcome, seconds)
+        self.observe(trace.operation, 'total', trace.outcome, total)
+        if METRICS_LOG_SPANS:
+            logger.info(json.dumps({
+                'operation': trace.operation,
+                'outcome': trace.outcome,
+                'total_ms': round(total * 1000, 2),
+                'spans_ms': {stage: round(seconds * 1000, 2) for stage, seconds in trace.spans.items()},
+                'pid': os.getpid()
+            }))
+
+    def render_prometheus(self) -> str:
+        """Render the histograms in the Prometheus text exposition format."""
+        name = 'operation_stage_duration_seconds'
+        pid = os.getpid()
+        lines = [
+            f'# HELP {name} Duration of each traced operation stage.',
+            f'# TYPE {name} histogram'
+        ]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for (operation, stage, outcome), histogram in items:
+                labels = f'operation="{operation}",stage="{stage}",outcome="{outcome}",pid="{pid}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram.total:.6f}')
+                lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+# Singleton instance
+latency_metrics = LatencyMetrics()
@@ -0,0 +1,233 @@
+import os
+import time
+import sqlite3
+import threading
+from math import floor
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+from limits.strategies import SlidingWindowCounterRateLimiter
+from limits import parse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Shared by every gunicorn worker on the host; use memory:// only for a single process
+RATE_LIMIT_STORAGE_URI = os.getenv(
+    'RATE_LIMIT_STORAGE_URI',
+    'sqlite:///' + os.path.join(project_root, 'instance', 'rate_limits.sqlite3')
+)
+# Expired counters are swept after this many writes
+RATE_LIMIT_SWEEP_EVERY = int(os.getenv('RATE_LIMIT_SWEEP_EVERY', 1000))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit_counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate limit storage in a local SQLite file in WAL mode.
+
+    Registered with the limits package under ``sqlite:///path`` (SQLAlchemy
+    style, four slashes for an absolute path), so Flask-Limiter and
+    login_rate_limiter share counters across every worker process on the
+    host and keep them across restarts. Each check is one short
+    ``BEGIN IMMEDIATE`` transaction on a per-thread connection, and the
+    sliding window counter check-and-increment is atomic across processes.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri: str = None, wrap_exceptions: bool = False, **options):
+        path = (uri or RATE_LIMIT_STORAGE_URI).split('://', 1)[1]
+        # sqlite:///relative.db and sqlite:////absolute/path.db
+        self.path = path[1:] if path.startswith('/') else path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _transaction(self, work):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = work(connection)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._writes += 1
+        if self._writes % RATE_LIMIT_SWEEP_EVERY == 0:
+            connection.execute('DELETE FROM rate_limit_counters WHERE expires_at <= ?', (time.time(),))
+        return result
+
+    @staticmethod
+    def _get(connection, key: str, now: float) -> int:
+        row = connection.execute(
+            'SELECT value FROM rate_limit_counters WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _incr(connection, key: str, expiry: float, amount: int, now: float) -> int:
+        connection.execute(
+            'INSERT INTO rate_limit_counters (key, value, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET '
+            'value = CASE WHEN expires_at <= ? THEN excluded.value ELSE value + excluded.value END, '
+            'expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END',
+            (key, amount, now + expiry, now, now)
+        )
+        return SQLiteStorage._get(connection, key, now)
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        return self._transaction(lambda connection: self._incr(connection, key, expiry, amount, time.time()))
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        def work(connection):
+            now = time.time()
+            connection.execute(
+                'UPDATE rate_limit_counters SET value = MAX(value - ?, 0) WHERE key = ? AND expires_at > ?',
+                (amount, key, now)
+            )
+            return self._get(connection, key, now)
+        return self._transaction(work)
+
+    def get(self, key: str) -> int:
+        return self._get(self._connection(), key, time.time())
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires_at FROM rate_limit_counters WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        connection = self._connection()
+        removed = connection.execute('SELECT COUNT(*) FROM rate_limit_counters').fetchone()[0]
+        connection.execute('DELETE FROM rate_limit_counters')
+        return removed
+
+    def clear(self, key: str) -> None:
+        self._connection().execute('DELETE FROM rate_limit_counters WHERE key = ?', (key,))
+
+    # Sliding window counter: the previous fixed window's count is weighted by
+    # how much of it still overlaps the sliding window.
+
+    @staticmethod
+    def _window_info(connection, previous_key, current_key, expiry, now):
+        previous_count = SQLiteStorage._get(connection, previous_key, now)
+        current_count = SQLiteStorage._get(connection, current_key, now)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+
+        def work(connection):
+            now = time.time()
+            previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+            previous_count, previous_ttl, current_count, _ = self._window_info(
+                connection, previous_key, current_key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            # The current window's counter lives for two windows so it can become the previous one
+            self._incr(connection, current_key, 2 * expiry, amount, now)
+            return True
+        return self._transaction(work)
+
+    def get_sliding_window(self, key: str, expiry: int):
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._window_info(self._connection(), previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
+
+
+class LoginRateLimiter:
+    """Sliding-window limits on login attempts, keyed by client IP and by account.
+
+    Every attempt counts against the client IP. The per-account limit only
+    counts failed attempts (record_failure), so posting someone's email
+    can't lock them out unless the password is wrong too. Counters live in
+    the shared limiter storage instead of the session cookie, so dropping
+    the cookie or hitting another worker doesn't reset them. The client IP
+    is request.remote_addr: behind a reverse proxy set TRUSTED_PROXY_COUNT
+    (see app.py) or every user shares the proxy's budget.
+    """
+
+    def __init__(self, storage_uri: str = RATE_LIMIT_STORAGE_URI,
+                 per_ip: str = None, per_account: str = None):
+        from limits.storage import storage_from_string
+        self.storage = storage_from_string(storage_uri)
+        self.strategy = SlidingWindowCounterRateLimiter(self.storage)
+        self.per_ip = parse(per_ip or os.getenv('LOGIN_RATE_LIMIT_PER_IP', '30 per 5 minutes'))
+        self.per_account = parse(per_account or os.getenv('LOGIN_RATE_LIMIT_PER_ACCOUNT', '10 per 5 minutes'))
+
+    @staticmethod
+    def _account_key(account: str) -> str:
+        return account.strip().lower()
+
+    def _retry_after(self, item, *identifiers) -> int:
+        stats = self.strategy.get_window_stats(item, *identifiers)
+        return max(1, int(stats.reset_time - time.time()))
+
+    def hit(self, ip: str, account: str = None):
+        """Record an attempt from ip and check account's failure budget.
+
+        Returns (allowed, seconds until retry, attempts left). The account
+        counter is only checked here; record_failure() increments it.
+        """
+        ip_key = ip or 'unknown'
+        if account and not self.strategy.test(self.per_account, 'login-account', self._account_key(account)):
+            return False, self._retry_after(self.per_account, 'login-account', self._account_key(account)), 0
+        if not self.strategy.hit(self.per_ip, 'login-ip', ip_key):
+            return False, self._retry_after(self.per_ip, 'login-ip', ip_key), 0
+        remaining = self.strategy.get_window_stats(self.per_ip, 'login-ip', ip_key).remaining
+        if account:
+            remaining = min(remaining, self.strategy.get_window_stats(
+                self.per_account, 'login-account', self._account_key(account)).remaining)
+        return True, 0, remaining
+
+    def record_failure(self, account: str):
+        """Count a failed login (wrong password) against account."""
+        if account:
+            self.strategy.hit(self.per_account, 'login-account', self._account_key(account))
+
+    def reset(self, ip: str, account: str = None):
+        self.strategy.clear(self.per_ip, 'login-ip', ip or 'unknown')
+        if account:
+            self.strategy.clear(self.per_account, 'login-account', self._account_key(account))
+
+
+# Singleton instance
+login_rate_limiter = LoginRateLimiter()